@@ -1,8 +1,10 @@
+import click
 from flask import Flask
 from flask_cors import CORS
 
 from config import get_config
 
+from .cache import init_app as init_cache
 from .db import create_schema, init_app as init_db
 
 
@@ -10,14 +12,26 @@ def create_app() -> Flask:
     """Application factory for the Flask API."""
     app = Flask(__name__)
     app.config.from_object(get_config())
+
+    try:
+        from .json_provider import OrjsonProvider
+    except ImportError:  # orjson is optional; keep Flask's stdlib provider
+        pass
+    else:
+        app.json = OrjsonProvider(app)
+
     init_db(app)
+    init_cache(app)
 
     # Enable CORS for all routes
     CORS(app, resources={r"/api/*": {"origins": "*"}})
 
     from .routes import api_bp
+    from .workflows.product_scan_workflow import ProductScanWorkflow
 
     app.register_blueprint(api_bp)
+    ProductScanWorkflow.DEFAULT_LAT = app.config['DEFAULT_STORE_LAT']
+    ProductScanWorkflow.DEFAULT_LON = app.config['DEFAULT_STORE_LON']
 
     @app.route("/health", methods=["GET"])
     def health_check():
@@ -29,4 +43,33 @@ def create_app() -> Flask:
         create_schema(app)
         print("Database schema created.")
 
+    @app.cli.command("refresh-scores")
+    @click.option("--all", "refresh_all", is_flag=True,
+                  help="Recompute every product, not only those without cached scores.")
+    def refresh_scores_command(refresh_all: bool):
+        """Recompute the cached recommendation scores on the products table."""
+        from .db import get_connection
+        from .services.recommendation_service import RecommendationService
+
+        if refresh_all:
+            # Precomputed scan scores are rebuilt lazily on the next scan
+            get_connection().execute("DELETE FROM product_scores")
+
+        # Stream the ids through a server-side cursor instead of loading the whole
+        # table; WITH HOLD keeps it open across the autocommitted score updates
+        refreshed = 0
+        with get_connection().cursor(name="refresh_scores", withhold=True) as cursor:
+            cursor.itersize = 500
+            cursor.execute(
+                "SELECT id FROM products"
+                + ("" if refresh_all else " WHERE recommendation_score IS NULL")
+            )
+            for (product_id,) in cursor:
+                try:
+                    RecommendationService.refresh_cached_scores(product_id)
+                except Exception as exc:
+                    print(f"Failed to score product {product_id}: {exc}")
+                refreshed += 1
+        print(f"Refreshed scores for {refreshed} products.")
+
     return app
@@ -0,0 +1,62 @@
+"""
+Optional Redis cache shared across workers.
+
+Enabled when REDIS_URL is configured and the redis package is installed;
+otherwise every lookup is a miss and writes are no-ops.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from flask import current_app
+
+try:
+    import redis
+except ImportError:  # optional dependency
+    redis = None
+
+_REDIS_KEY = "redis"
+
+
+def init_app(app) -> None:
+    """Create the shared Redis client if caching is configured."""
+    url = app.config.get("REDIS_URL")
+    if not url:
+        return
+    if redis is None:
+        app.logger.warning("[Cache] REDIS_URL is set but the redis package is not installed")
+        return
+
+    app.extensions[_REDIS_KEY] = redis.Redis.from_url(
+        url,
+        socket_timeout=app.config.get("REDIS_TIMEOUT", 0.5),
+        socket_connect_timeout=app.config.get("REDIS_TIMEOUT", 0.5),
+    )
+
+
+def cache_get(key: str) -> Optional[Any]:
+    """Return the decoded JSON value stored under key, or None on a miss or error."""
+    client = current_app.extensions.get(_REDIS_KEY)
+    if client is None:
+        return None
+
+    try:
+        raw = client.get(key)
+    except redis.RedisError as exc:
+        current_app.logger.warning(f"[Cache] GET {key} failed: {exc}")
+        return None
+
+    return current_app.json.loads(raw) if raw is not None else None
+
+
+def cache_set(key: str, value: Any, ttl: int) -> None:
+    """Store value as JSON under key for ttl seconds; errors are logged and ignored."""
+    client = current_app.extensions.get(_REDIS_KEY)
+    if client is None:
+        return
+
+    try:
+        client.setex(key, ttl, current_app.json.dumps(value))
+    except redis.RedisError as exc:
+        current_app.logger.warning(f"[Cache] SETEX {key} failed: {exc}")
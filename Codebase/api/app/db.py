@@ -21,12 +21,16 @@ def init_app(app) -> None:
     if not conninfo:
         raise RuntimeError("DATABASE_URL is not configured")
 
+    # DB_POOL_SIZE connections serve requests (one each); DB_POOL_OVERFLOW more
+    # cover the background consumers, which check out their own connections:
+    # a ProductStorageService.save_products_parallel batch (up to 8 workers)
+    # and the scan workflow's prefetch executor (2 jobs)
     pool = ConnectionPool(
         conninfo=conninfo,
         min_size=1,
-        max_size=app.config.get("DB_POOL_SIZE", 5),
+        max_size=app.config.get("DB_POOL_SIZE", 5) + app.config.get("DB_POOL_OVERFLOW", 10),
         timeout=app.config.get("DB_TIMEOUT", 10.0),
-        kwargs={"autocommit": True},
+        kwargs={"autocommit": True, "prepare_threshold": 5},
     )
     app.extensions[_POOL_KEY] = pool
 
@@ -1,9 +1,9 @@
 from flask import Blueprint, current_app, jsonify, request
-import asyncio
 
 from .db import get_connection
 from .services.open_food_facts import OpenFoodFactsService
 from .services.product_storage import ProductStorageService
+from .utils.barcode import get_primary_barcode
 from .workflows.product_scan_workflow import execute_product_scan_workflow
 
 api_bp = Blueprint("api", __name__, url_prefix="/api")
@@ -123,8 +123,8 @@ def get_product(barcode: str):
                        LEFT JOIN manufacturers m ON p.brand_id = m.id
                        LEFT JOIN product_categories pc ON p.id = pc.product_id AND pc.is_primary = TRUE
                        LEFT JOIN categories c ON pc.category_id = c.id
-                       WHERE p.upc = %s OR p.upc = %s""",
-                    (barcode, barcode.zfill(13))
+                       WHERE p.upc = %s""",
+                    (get_primary_barcode(barcode),)
                 )
                 existing_product = cursor.fetchone()
 
@@ -153,7 +153,7 @@ def get_product(barcode: str):
                 })
 
             # Not in database - fetch and save
-            off_product = asyncio.run(OpenFoodFactsService.fetch_product(barcode))
+            off_product = OpenFoodFactsService.run(OpenFoodFactsService.fetch_product(barcode))
 
             if not off_product:
                 return jsonify({
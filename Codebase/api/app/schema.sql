@@ -63,6 +63,8 @@ CREATE TABLE IF NOT EXISTS ingredient_emission_factors (
 
 CREATE INDEX IF NOT EXISTS idx_ingredient_emission_tag ON ingredient_emission_factors(ingredient_tag);
 CREATE INDEX IF NOT EXISTS idx_ingredient_emission_category ON ingredient_emission_factors(category);
+CREATE INDEX IF NOT EXISTS idx_ief_tag
+    ON ingredient_emission_factors(ingredient_tag) INCLUDE (kg_co2_per_kg, confidence);
 
 -- Allergens
 CREATE TABLE IF NOT EXISTS allergens (
@@ -183,13 +185,13 @@ CREATE TABLE IF NOT EXISTS products (
 
     -- Product Identification
     upc TEXT UNIQUE NOT NULL,
-    product_name TEXT NOT NULL,
+    product_name TEXT NOT NULL GENERATED ALWAYS AS (raw_off_data->>'product_name') STORED,
     brand_id INTEGER REFERENCES manufacturers(id),
 
     -- Quantity
-    quantity TEXT,                           -- Raw from OFF
+    quantity TEXT GENERATED ALWAYS AS (raw_off_data->>'quantity') STORED,                 -- Raw from OFF
     quantity_grams DECIMAL(10,2),            -- Parsed numeric
-    serving_size TEXT,                       -- Raw from OFF
+    serving_size TEXT GENERATED ALWAYS AS (raw_off_data->>'serving_size') STORED,         -- Raw from OFF
     serving_size_grams DECIMAL(10,2),        -- Parsed numeric
 
     -- Processing & Classification
@@ -197,15 +199,15 @@ CREATE TABLE IF NOT EXISTS products (
     food_groups_tags TEXT[],                 -- For Agribalyse matching
 
     -- Manufacturing & Origin
-    manufacturing_places TEXT,               -- Raw from OFF
+    manufacturing_places TEXT GENERATED ALWAYS AS (raw_off_data->>'manufacturing_places') STORED, -- Raw from OFF
     manufacturing_city VARCHAR(100),         -- Parsed
     manufacturing_region VARCHAR(100),       -- Parsed
     manufacturing_country VARCHAR(100),      -- Parsed
 
     -- Ingredients (text versions)
-    ingredients_text TEXT,
-    labels_text TEXT,
-    packaging_text TEXT,
+    ingredients_text TEXT GENERATED ALWAYS AS (raw_off_data->>'ingredients_text') STORED,
+    labels_text TEXT GENERATED ALWAYS AS (raw_off_data->>'labels') STORED,
+    packaging_text TEXT GENERATED ALWAYS AS (raw_off_data->>'packaging') STORED,
     has_palm_oil BOOLEAN DEFAULT FALSE,
 
     -- Open Food Facts Reference Scores
@@ -217,15 +219,26 @@ CREATE TABLE IF NOT EXISTS products (
     completeness NUMERIC(5,2),
 
     -- Images
-    image_url TEXT,                          -- Full-size product image
-    image_small_url TEXT,                    -- Thumbnail image (200px)
+    image_url TEXT GENERATED ALWAYS AS (raw_off_data->>'image_front_url') STORED,             -- Full-size product image
+    image_small_url TEXT GENERATED ALWAYS AS (raw_off_data->>'image_front_small_url') STORED, -- Thumbnail image (200px)
 
     -- Price Information
     price DECIMAL(10,2),                     -- Latest price in USD
     price_updated_at TIMESTAMPTZ,            -- When price was last updated
 
+    -- Cached Recommendation Scores (refreshed on save / `flask refresh-scores`)
+    raw_materials_score SMALLINT,            -- -15 to +10
+    packaging_score SMALLINT,                -- -15 to +10
+    climate_score SMALLINT,                  -- -10 to +10
+    sustainability_score SMALLINT,           -- 0-100
+    sustainability_grade CHAR(1),            -- A-E
+    harmful_ingredients SMALLINT,
+    caution_ingredients SMALLINT,
+    recommendation_score SMALLINT,           -- sustainability_score - health penalty
+    scores_updated_at TIMESTAMPTZ,
+
     -- Raw Data Storage
-    raw_off_data JSONB,                      -- Full OFF product object
+    raw_off_data JSONB,                      -- Full OFF product object (source of generated text columns)
 
     -- Timestamps
     created_at TIMESTAMPTZ DEFAULT NOW(),
@@ -238,6 +251,7 @@ CREATE INDEX IF NOT EXISTS idx_products_upc ON products(upc);
 CREATE INDEX IF NOT EXISTS idx_products_brand ON products(brand_id);
 CREATE INDEX IF NOT EXISTS idx_products_nova_group ON products(nova_group);
 CREATE INDEX IF NOT EXISTS idx_products_manufacturing_country ON products(manufacturing_country);
+CREATE INDEX IF NOT EXISTS idx_products_recommendation_score ON products(recommendation_score);
 
 --
 -- Junction Tables (Many-to-Many Relationships)
@@ -285,6 +299,8 @@ CREATE TABLE IF NOT EXISTS product_ingredients (
 CREATE INDEX IF NOT EXISTS idx_product_ingredients_product ON product_ingredients(product_id);
 CREATE INDEX IF NOT EXISTS idx_product_ingredients_ingredient ON product_ingredients(ingredient_id);
 CREATE INDEX IF NOT EXISTS idx_product_ingredients_rank ON product_ingredients(product_id, rank);
+CREATE INDEX IF NOT EXISTS idx_pi_product_rank
+    ON product_ingredients(product_id, rank) INCLUDE (ingredient_id, percent_estimate);
 
 CREATE TABLE IF NOT EXISTS product_allergens (
     product_id BIGINT REFERENCES products(id) ON DELETE CASCADE,
@@ -317,10 +333,15 @@ CREATE TABLE IF NOT EXISTS packagings (
     weight_percentage DECIMAL(5,2),          -- Percentage of total packaging
     material_text TEXT,
     shape_text TEXT,
-    recycling_text TEXT
+    recycling_text TEXT,
+    content_hash BYTEA                       -- sha1(material|shape|recycling|units|occurrence)
 );
 
 CREATE INDEX IF NOT EXISTS idx_packagings_product ON packagings(product_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_packagings_product_content
+    ON packagings(product_id, content_hash);
+CREATE INDEX IF NOT EXISTS idx_packagings_product_covering
+    ON packagings(product_id) INCLUDE (material_id, weight_percentage);
 CREATE INDEX IF NOT EXISTS idx_packagings_material ON packagings(material_id);
 CREATE INDEX IF NOT EXISTS idx_packagings_shape ON packagings(shape_id);
 
@@ -426,6 +447,15 @@ CREATE TABLE IF NOT EXISTS score_breakdown (
 
 CREATE INDEX IF NOT EXISTS idx_score_breakdown_score ON score_breakdown(score_id);
 
+-- Precomputed scan scores for the default store location (as returned by the scan workflow)
+CREATE TABLE IF NOT EXISTS product_scores (
+    product_id BIGINT PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+    total_score SMALLINT NOT NULL,           -- 0-100
+    grade CHAR(1) NOT NULL,                  -- A-E
+    metrics JSONB NOT NULL,
+    computed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
 --
 -- Helper Functions
 --
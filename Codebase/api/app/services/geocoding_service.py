@@ -4,9 +4,20 @@ Handles converting location text to coordinates using Nominatim (OpenStreetMap)
 """
 
 import requests
+import threading
 import time
-from typing import Optional, Tuple
-from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from flask import current_app, has_app_context
+
+from ..db import get_connection
+
+# Process-wide lookups keyed by normalized location text: key -> (expires_at, coords).
+# Resolved locations never expire; failed ones (coords None) are retried after
+# GeocodingService.NEGATIVE_CACHE_TTL seconds. Oldest entries are dropped when full.
+_GEOCODE_CACHE: Dict[str, Tuple[float, Optional[Tuple[float, float]]]] = {}
+_GEOCODE_CACHE_MAXSIZE = 8192
+_geocode_cache_lock = threading.Lock()
 
 
 class GeocodingService:
@@ -15,6 +26,9 @@ class GeocodingService:
     NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
     USER_AGENT = "CognizantEcoApp/1.0 (Sustainability Tracking)"
 
+    # How long a location Nominatim could not resolve is remembered (seconds)
+    NEGATIVE_CACHE_TTL = 24 * 3600
+
     # Common manufacturing locations (in-memory cache to avoid repeated API calls)
     COMMON_LOCATIONS = {
         "usa": (37.0902, -95.7129),
@@ -35,11 +49,10 @@ class GeocodingService:
     }
 
     @classmethod
-    @lru_cache(maxsize=500)
     def geocode(cls, location_text: str) -> Optional[Tuple[float, float]]:
         """
         Convert location text to coordinates (latitude, longitude).
-        Uses in-memory cache and Nominatim API.
+        Uses in-memory cache, the geocoding_cache table and Nominatim API.
 
         Args:
             location_text: Location string (e.g., "USA", "Toronto, Ontario", "Italy")
@@ -50,15 +63,93 @@ class GeocodingService:
         if not location_text:
             return None
 
-        # Normalize location text
-        normalized = location_text.lower().strip()
+        # Only the cache key is normalized, so " France" and "france" share entries;
+        # Nominatim still gets the text as written
+        key = location_text.lower().strip()
 
         # Check common locations first (fast path)
-        if normalized in cls.COMMON_LOCATIONS:
-            return cls.COMMON_LOCATIONS[normalized]
+        if key in cls.COMMON_LOCATIONS:
+            return cls.COMMON_LOCATIONS[key]
+
+        now = time.monotonic()
+        with _geocode_cache_lock:
+            cached = _GEOCODE_CACHE.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        coords = cls._geocode_uncached(key, location_text)
+
+        ttl = float("inf") if coords is not None else cls.NEGATIVE_CACHE_TTL
+        with _geocode_cache_lock:
+            if key not in _GEOCODE_CACHE and len(_GEOCODE_CACHE) >= _GEOCODE_CACHE_MAXSIZE:
+                _GEOCODE_CACHE.pop(next(iter(_GEOCODE_CACHE)))
+            _GEOCODE_CACHE[key] = (now + ttl, coords)
+        return coords
+
+    @classmethod
+    def _geocode_uncached(cls, key: str, location_text: str) -> Optional[Tuple[float, float]]:
+        """Resolve a location through the geocoding_cache table, then Nominatim."""
+        # Check the persistent cache shared by all workers
+        row = cls._get_cached_coords(key)
+        if row is not None:
+            return row if row[0] is not None else None
+
+        # Geocode with Nominatim; failures are stored too so other workers skip them
+        coords = cls._geocode_nominatim(location_text)
+        cls._store_cached_coords(key, coords)
+        return coords
+
+    @classmethod
+    def _get_cached_coords(cls, key: str) -> Optional[Tuple[Optional[float], Optional[float]]]:
+        """
+        Look up a location in the geocoding_cache table.
 
-        # Geocode with Nominatim
-        return cls._geocode_nominatim(location_text)
+        Returns the stored (lat, lon), (None, None) for a recent failed lookup, or
+        None when the location is not cached.
+        """
+        if not has_app_context():
+            return None
+        try:
+            conn = get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """SELECT lat, lon FROM geocoding_cache
+                       WHERE location = %s
+                         AND (lat IS NOT NULL OR created_at > NOW() - make_interval(secs => %s))""",
+                    (key, cls.NEGATIVE_CACHE_TTL),
+                )
+                row = cursor.fetchone()
+            return (row[0], row[1]) if row else None
+        except Exception as e:
+            current_app.logger.warning(f"[Geocoding] Cache lookup failed for '{key}': {e}")
+            return None
+
+    @staticmethod
+    def _store_cached_coords(key: str, coords: Optional[Tuple[float, float]]) -> None:
+        """
+        Persist a geocode result in the geocoding_cache table.
+
+        A failed lookup (coords None) is stored with NULL coordinates; it is refreshed by
+        the next attempt, while resolved coordinates are never overwritten.
+        """
+        if not has_app_context():
+            return
+        lat, lon = coords if coords is not None else (None, None)
+        try:
+            conn = get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """INSERT INTO geocoding_cache (location, lat, lon)
+                       VALUES (%s, %s, %s)
+                       ON CONFLICT (location) DO UPDATE SET
+                           lat = EXCLUDED.lat,
+                           lon = EXCLUDED.lon,
+                           created_at = NOW()
+                       WHERE geocoding_cache.lat IS NULL""",
+                    (key, lat, lon),
+                )
+        except Exception as e:
+            current_app.logger.warning(f"[Geocoding] Cache store failed for '{key}': {e}")
 
     @classmethod
     def _geocode_nominatim(cls, location_text: str) -> Optional[Tuple[float, float]]:
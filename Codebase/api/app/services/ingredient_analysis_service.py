@@ -1,12 +1,23 @@
 """Service for analyzing product ingredients and health classification."""
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Sequence, Tuple
 from ..db import get_connection
 
 
 class IngredientAnalysisService:
     """Service for analyzing product ingredients and their health impacts."""
 
+    # (harmful_count, caution_count) for one product; queued by
+    # RecommendationService._compute_recommendation_score in its scoring pipeline
+    FLAGGED_COUNTS_SQL = """
+        SELECT
+            COUNT(*) FILTER (WHERE i.health_classification = 'harmful'),
+            COUNT(*) FILTER (WHERE i.health_classification = 'caution')
+        FROM product_ingredients AS pi
+        JOIN ingredients AS i ON i.id = pi.ingredient_id
+        WHERE pi.product_id = %s
+    """
+
     @classmethod
     def analyze_ingredients(cls, product_id: int) -> Dict[str, Any]:
         """
@@ -33,7 +44,7 @@ class IngredientAnalysisService:
                     i.vegan_status,
                     i.vegetarian_status,
                     i.is_from_palm_oil,
-                    pi.percent_estimate,
+                    pi.percent_estimate::double precision,
                     pi.rank
                 FROM product_ingredients AS pi
                 JOIN ingredients AS i ON i.id = pi.ingredient_id
@@ -97,7 +108,7 @@ class IngredientAnalysisService:
 
             # Add optional fields
             if percent_estimate:
-                ingredient_data["percent"] = float(percent_estimate)
+                ingredient_data["percent"] = percent_estimate
 
             if classification in ['caution', 'harmful'] and health_concerns:
                 ingredient_data["health_concerns"] = health_concerns
@@ -126,3 +137,37 @@ class IngredientAnalysisService:
             },
             "ingredients": ingredients_list
         }
+
+    @classmethod
+    def count_health_classifications(cls, product_ids: Sequence[int]) -> Dict[int, Tuple[int, int]]:
+        """
+        Count harmful and caution ingredients for many products in one query.
+
+        Args:
+            product_ids: Product IDs
+
+        Returns:
+            Mapping of product ID to (harmful_count, caution_count); products
+            without ingredients are omitted
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return {}
+
+        conn = get_connection()
+
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT
+                    pi.product_id,
+                    COUNT(*) FILTER (WHERE i.health_classification = 'harmful'),
+                    COUNT(*) FILTER (WHERE i.health_classification = 'caution')
+                FROM product_ingredients AS pi
+                JOIN ingredients AS i ON i.id = pi.ingredient_id
+                WHERE pi.product_id = ANY(%s)
+                GROUP BY pi.product_id
+                """,
+                (product_ids,),
+            )
+            return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
@@ -4,10 +4,74 @@ Handles fetching and parsing product data from Open Food Facts API
 """
 
 import aiohttp
+import asyncio
 import os
-from typing import Optional, Dict, Any, List
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, List, Tuple, Coroutine
 from datetime import datetime
 
+try:
+    import uvloop
+except ImportError:  # optional: lower event loop overhead when installed
+    uvloop = None
+
+# (category_tag, page_size) -> (fetched_at, products); OFF search results change slowly.
+# Bounded: expired entries are dropped on insert, then the oldest if still full
+_CATEGORY_SEARCH_CACHE: Dict[Tuple[str, int], Tuple[float, List[Dict[str, Any]]]] = {}
+_CATEGORY_SEARCH_CACHE_MAXSIZE = 1024
+_category_search_cache_lock = threading.Lock()
+
+
+# Shared HTTP client: one keep-alive aiohttp session owned by a long-running
+# background event loop, so connections (and their TLS handshakes) to OFF are
+# reused across requests instead of being rebuilt by every asyncio.run()
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_client_loop_lock = threading.Lock()
+_client_session: Optional[aiohttp.ClientSession] = None
+
+
+def _get_client_loop() -> asyncio.AbstractEventLoop:
+    """Return the background client loop, starting its thread on first use."""
+    global _client_loop
+    with _client_loop_lock:
+        if _client_loop is None:
+            loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="off-client", daemon=True).start()
+            _client_loop = loop
+    return _client_loop
+
+
+async def _get_session() -> aiohttp.ClientSession:
+    """Return the shared session; must run on the client loop."""
+    global _client_session
+    if _client_session is None or _client_session.closed:
+        _client_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=60)
+        )
+    return _client_session
+
+
+async def _on_client_loop(coro: Coroutine) -> Any:
+    """Await coro on the client loop from whichever event loop the caller runs."""
+    loop = _get_client_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+def _safe_get(data: dict, *keys, default=None):
+    """Safely get nested values from OFF dicts"""
+    for key in keys:
+        if isinstance(data, dict):
+            data = data.get(key)
+        else:
+            return default
+        if data is None:
+            return default
+    return data
+
 
 class OpenFoodFactsService:
     """Service for interacting with Open Food Facts API"""
@@ -22,6 +86,11 @@ class OpenFoodFactsService:
         """Get API timeout from environment or use default"""
         return int(os.getenv('OFF_API_TIMEOUT', '10'))
 
+    @staticmethod
+    def get_category_cache_ttl() -> int:
+        """Get category search cache TTL in seconds from environment or use default"""
+        return int(os.getenv('OFF_CATEGORY_CACHE_TTL', '3600'))
+
     @staticmethod
     def get_prices_base_url() -> str:
         """Get Prices API base URL from environment or use default"""
@@ -64,6 +133,16 @@ class OpenFoodFactsService:
         'image_front_small_url',
     ]
 
+    @staticmethod
+    def submit(coro: Coroutine) -> Future:
+        """Schedule coro on the shared client loop; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, _get_client_loop())
+
+    @classmethod
+    def run(cls, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run coro on the shared client loop and wait for its result (for sync callers)"""
+        return cls.submit(coro).result(timeout)
+
     @classmethod
     async def fetch_product(cls, barcode: str) -> Optional[Dict[str, Any]]:
         """
@@ -78,6 +157,11 @@ class OpenFoodFactsService:
         Returns:
             Product data dict or None if not found
         """
+        return await _on_client_loop(cls._fetch_product(barcode))
+
+    @classmethod
+    async def _fetch_product(cls, barcode: str) -> Optional[Dict[str, Any]]:
+        """Fetch a product from the OFF API (runs on the client loop)"""
         from ..utils.barcode import normalize_barcode
 
         base_url = cls.get_base_url()
@@ -90,37 +174,38 @@ class OpenFoodFactsService:
         try:
             timeout = cls.get_timeout()
             headers = {'User-Agent': 'EcoApp/1.0 (Sustainability Product Scanner)'}
-            async with aiohttp.ClientSession(headers=headers) as session:
-                # Try each barcode variant until we find a match
-                for variant in barcode_variants:
-                    url = f"{base_url}/api/v2/product/{variant}.json"
-
-                    async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
-                        if response.status != 200:
-                            print(f"[OFF] Barcode {variant}: HTTP {response.status}")
-                            continue  # Try next variant
-
-                        data = await response.json()
-
-                        # Check if product was found
-                        status = data.get('status')
-                        status_verbose = data.get('status_verbose')
-
-                        if status != 1:
-                            print(f"[OFF] Barcode {variant}: status={status}, status_verbose={status_verbose}")
-                            continue  # Try next variant
-
-                        product = data.get('product')
-                        if product:
-                            print(f"[OFF] Barcode {variant}: Found! Product name: {product.get('product_name', 'N/A')}")
-                            return product
-                        else:
-                            print(f"[OFF] Barcode {variant}: status=1 but no product data")
-                            continue  # Try next variant
-
-                # If we get here, none of the variants worked
-                print(f"[OFF] Product not found for any variant of barcode {barcode}")
-                return None
+            session = await _get_session()
+            # Try each barcode variant until we find a match
+            for variant in barcode_variants:
+                url = f"{base_url}/api/v2/product/{variant}.json"
+
+                async with session.get(url, params=params, headers=headers,
+                                       timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    if response.status != 200:
+                        print(f"[OFF] Barcode {variant}: HTTP {response.status}")
+                        continue  # Try next variant
+
+                    data = await response.json()
+
+                    # Check if product was found
+                    status = data.get('status')
+                    status_verbose = data.get('status_verbose')
+
+                    if status != 1:
+                        print(f"[OFF] Barcode {variant}: status={status}, status_verbose={status_verbose}")
+                        continue  # Try next variant
+
+                    product = data.get('product')
+                    if product:
+                        print(f"[OFF] Barcode {variant}: Found! Product name: {product.get('product_name', 'N/A')}")
+                        return product
+                    else:
+                        print(f"[OFF] Barcode {variant}: status=1 but no product data")
+                        continue  # Try next variant
+
+            # If we get here, none of the variants worked
+            print(f"[OFF] Product not found for any variant of barcode {barcode}")
+            return None
 
         except aiohttp.ClientError as e:
             # Log error but don't crash
@@ -144,17 +229,6 @@ class OpenFoodFactsService:
         if not off_product:
             return {}
 
-        # Helper to safely get nested values
-        def safe_get(data: dict, *keys, default=None):
-            for key in keys:
-                if isinstance(data, dict):
-                    data = data.get(key)
-                else:
-                    return default
-                if data is None:
-                    return default
-            return data
-
         # Extract nutriments
         nutriments = off_product.get('nutriments', {})
 
@@ -198,13 +272,13 @@ class OpenFoodFactsService:
 
             # Nutrition (per 100g)
             'nutrition': {
-                'calories_100g': safe_get(nutriments, 'energy-kcal_100g'),
-                'protein_100g': safe_get(nutriments, 'proteins_100g'),
-                'fat_100g': safe_get(nutriments, 'fat_100g'),
-                'carbohydrates_100g': safe_get(nutriments, 'carbohydrates_100g'),
-                'sugars_100g': safe_get(nutriments, 'sugars_100g'),
-                'salt_100g': safe_get(nutriments, 'salt_100g'),
-                'fiber_100g': safe_get(nutriments, 'fiber_100g'),
+                'calories_100g': _safe_get(nutriments, 'energy-kcal_100g'),
+                'protein_100g': _safe_get(nutriments, 'proteins_100g'),
+                'fat_100g': _safe_get(nutriments, 'fat_100g'),
+                'carbohydrates_100g': _safe_get(nutriments, 'carbohydrates_100g'),
+                'sugars_100g': _safe_get(nutriments, 'sugars_100g'),
+                'salt_100g': _safe_get(nutriments, 'salt_100g'),
+                'fiber_100g': _safe_get(nutriments, 'fiber_100g'),
             },
 
             # Processing
@@ -264,6 +338,32 @@ class OpenFoodFactsService:
         Returns:
             List of product data dictionaries
         """
+        page_size = min(page_size, 100)
+        cache_key = (category, page_size)
+        ttl = cls.get_category_cache_ttl()
+        with _category_search_cache_lock:
+            cached = _CATEGORY_SEARCH_CACHE.get(cache_key)
+        if cached and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+
+        products = await _on_client_loop(cls._search_products_by_category(category, page_size))
+        if products:
+            # Failed/empty searches are not cached so they are retried next time
+            now = time.monotonic()
+            with _category_search_cache_lock:
+                _CATEGORY_SEARCH_CACHE.pop(cache_key, None)
+                if len(_CATEGORY_SEARCH_CACHE) >= _CATEGORY_SEARCH_CACHE_MAXSIZE:
+                    for key in [k for k, (fetched_at, _) in _CATEGORY_SEARCH_CACHE.items()
+                                if now - fetched_at >= ttl]:
+                        del _CATEGORY_SEARCH_CACHE[key]
+                while len(_CATEGORY_SEARCH_CACHE) >= _CATEGORY_SEARCH_CACHE_MAXSIZE:
+                    _CATEGORY_SEARCH_CACHE.pop(next(iter(_CATEGORY_SEARCH_CACHE)))
+                _CATEGORY_SEARCH_CACHE[cache_key] = (now, products)
+        return products
+
+    @classmethod
+    async def _search_products_by_category(cls, category: str, page_size: int) -> List[Dict[str, Any]]:
+        """Query the Open Food Facts Search API (uncached, runs on the client loop)"""
         base_url = cls.get_base_url()
         search_url = f"{base_url}/cgi/search.pl"
 
@@ -274,7 +374,7 @@ class OpenFoodFactsService:
             'tag_contains_0': 'contains',
             'tag_0': category,
             'sort_by': 'unique_scans_n',  # Sort by popularity
-            'page_size': min(page_size, 100),
+            'page_size': page_size,
             'json': 1,
             'fields': ','.join(cls.REQUIRED_FIELDS)
         }
@@ -282,19 +382,19 @@ class OpenFoodFactsService:
         try:
             # Search API is slower than product API, use longer timeout
             search_timeout = max(cls.get_timeout(), 30)  # At least 30 seconds
-            async with aiohttp.ClientSession() as session:
-                headers = {'User-Agent': 'EcoApp/1.0 (Product Recommendation System)'}
-                async with session.get(search_url, params=params, headers=headers,
-                                      timeout=aiohttp.ClientTimeout(total=search_timeout)) as response:
-                    if response.status != 200:
-                        print(f"Search API returned status {response.status}")
-                        return []
+            session = await _get_session()
+            headers = {'User-Agent': 'EcoApp/1.0 (Product Recommendation System)'}
+            async with session.get(search_url, params=params, headers=headers,
+                                  timeout=aiohttp.ClientTimeout(total=search_timeout)) as response:
+                if response.status != 200:
+                    print(f"Search API returned status {response.status}")
+                    return []
 
-                    data = await response.json()
-                    products = data.get('products', [])
+                data = await response.json()
+                products = data.get('products', [])
 
-                    # Return products (they're already in OFF format)
-                    return products
+                # Return products (they're already in OFF format)
+                return products
 
         except aiohttp.ClientError as e:
             print(f"Error searching products in category {category}: {e}")
@@ -325,6 +425,11 @@ class OpenFoodFactsService:
                 'location_name': 'Walmart'
             }
         """
+        return await _on_client_loop(cls._fetch_product_price(barcode, currency))
+
+    @classmethod
+    async def _fetch_product_price(cls, barcode: str, currency: str) -> Optional[Dict[str, Any]]:
+        """Query the Prices API (runs on the client loop)"""
         prices_base_url = cls.get_prices_base_url()
         url = f"{prices_base_url}/api/v1/prices"
 
@@ -337,27 +442,27 @@ class OpenFoodFactsService:
 
         try:
             timeout = cls.get_timeout()
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
-                    if response.status != 200:
-                        return None
-
-                    data = await response.json()
-
-                    # Check if any prices were found
-                    items = data.get('items', [])
-                    if not items:
-                        return None
-
-                    # Get the most recent price (first item)
-                    price_data = items[0]
-
-                    return {
-                        'price': price_data.get('price'),
-                        'currency': price_data.get('currency'),
-                        'date': price_data.get('date'),
-                        'location_name': price_data.get('location', {}).get('name') if isinstance(price_data.get('location'), dict) else None
-                    }
+            session = await _get_session()
+            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                if response.status != 200:
+                    return None
+
+                data = await response.json()
+
+                # Check if any prices were found
+                items = data.get('items', [])
+                if not items:
+                    return None
+
+                # Get the most recent price (first item)
+                price_data = items[0]
+
+                return {
+                    'price': price_data.get('price'),
+                    'currency': price_data.get('currency'),
+                    'date': price_data.get('date'),
+                    'location_name': price_data.get('location', {}).get('name') if isinstance(price_data.get('location'), dict) else None
+                }
 
         except aiohttp.ClientError as e:
             print(f"Error fetching price for product {barcode}: {e}")
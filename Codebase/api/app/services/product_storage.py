@@ -4,20 +4,34 @@ Handles saving Open Food Facts product data into our database
 """
 
 from typing import Dict, Any, Optional, List
+import hashlib
 import re
-import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from flask import current_app
+from psycopg.types.json import Jsonb
+from ..db import get_connection
 from ..utils.barcode import get_primary_barcode
 
+# Compiled once at import; parse_quantity runs twice per saved product
+_QUANTITY_NUMBER_RE = re.compile(r'(\d+\.?\d*)')
+# Metric volume units right after the number, as whole words (so "ml" and words
+# merely containing "cl" don't match); grams per unit at ~1 g/ml
+_QUANTITY_VOLUME_RE = re.compile(r'\d\s*(dl|cl|l|litres?|liters?)\b')
+_VOLUME_UNIT_GRAMS = {'dl': 100, 'cl': 10}
+
 
 class ProductStorageService:
     """Service for storing product data in the database"""
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def parse_quantity(quantity_str: Optional[str]) -> Optional[float]:
         """
         Parse quantity string to grams
-        Examples: "560", "560g", "1.5 kg" -> grams as float
+        Examples: "560", "560g", "1.5 kg", "33 cl", "1.5 L" -> grams as float (liquids at ~1 g/ml)
+        Memoized: OFF quantity strings ("500 g", "1 kg") repeat heavily on bulk imports
         """
         if not quantity_str:
             return None
@@ -26,7 +40,7 @@ class ProductStorageService:
         qty = str(quantity_str).strip().lower()
 
         # Extract number
-        match = re.search(r'(\d+\.?\d*)', qty)
+        match = _QUANTITY_NUMBER_RE.search(qty)
         if not match:
             return None
 
@@ -39,9 +53,11 @@ class ProductStorageService:
             return value * 453.592
         elif 'oz' in qty or 'ounce' in qty:
             return value * 28.3495
-        else:
-            # Assume grams if no unit or 'g'
-            return value
+        volume = _QUANTITY_VOLUME_RE.search(qty)
+        if volume:
+            return value * _VOLUME_UNIT_GRAMS.get(volume.group(1), 1000)
+        # Assume grams if no unit, 'g' or 'ml'
+        return value
 
     @staticmethod
     def parse_location(manufacturing_places: Optional[str]) -> Dict[str, Optional[str]]:
@@ -113,7 +129,7 @@ class ProductStorageService:
             return result[0]
 
         # Create slug from tag
-        slug = tag.replace('en:', '').replace('-', '_')
+        slug = tag.removeprefix('en:').replace('-', '_')
 
         # Create new
         cursor.execute(
@@ -127,8 +143,6 @@ class ProductStorageService:
     @classmethod
     def get_or_create_food_group(cls, cursor, tag: str) -> int:
         """Get or create food group and return ID"""
-        name = tag.replace('en:', '').replace('-', ' ').title()
-
         cursor.execute(
             "SELECT id FROM food_groups WHERE tag = %s",
             (tag,)
@@ -137,6 +151,8 @@ class ProductStorageService:
         if result:
             return result[0]
 
+        name = tag.removeprefix('en:').replace('-', ' ').title()
+
         cursor.execute(
             "INSERT INTO food_groups (tag, name) VALUES (%s, %s) RETURNING id",
             (tag, name)
@@ -150,8 +166,6 @@ class ProductStorageService:
                                  is_additive: bool = False,
                                  additive_code: Optional[str] = None) -> int:
         """Get or create ingredient and return ID"""
-        name = tag.replace('en:', '').replace('-', ' ').title()
-
         cursor.execute(
             "SELECT id FROM ingredients WHERE tag = %s",
             (tag,)
@@ -160,6 +174,8 @@ class ProductStorageService:
         if result:
             return result[0]
 
+        name = tag.removeprefix('en:').replace('-', ' ').title()
+
         cursor.execute(
             """INSERT INTO ingredients
                (tag, name, vegan_status, vegetarian_status, is_from_palm_oil, is_additive, additive_code)
@@ -172,8 +188,6 @@ class ProductStorageService:
     @classmethod
     def get_or_create_allergen(cls, cursor, tag: str) -> int:
         """Get or create allergen and return ID"""
-        name = tag.replace('en:', '').replace('-', ' ').title()
-
         cursor.execute(
             "SELECT id FROM allergens WHERE tag = %s",
             (tag,)
@@ -182,6 +196,8 @@ class ProductStorageService:
         if result:
             return result[0]
 
+        name = tag.removeprefix('en:').replace('-', ' ').title()
+
         cursor.execute(
             "INSERT INTO allergens (tag, name) VALUES (%s, %s) RETURNING id",
             (tag, name)
@@ -191,9 +207,6 @@ class ProductStorageService:
     @classmethod
     def get_or_create_label(cls, cursor, tag: str) -> int:
         """Get or create label and return ID"""
-        name = tag.replace('en:', '').replace('-', ' ').title()
-        slug = tag.replace('en:', '')
-
         cursor.execute(
             "SELECT id FROM labels WHERE tag = %s",
             (tag,)
@@ -202,6 +215,9 @@ class ProductStorageService:
         if result:
             return result[0]
 
+        slug = tag.removeprefix('en:')
+        name = slug.replace('-', ' ').title()
+
         # Determine bonus points based on label type
         bonus_points = 0
         label_category = 'other'
@@ -227,9 +243,6 @@ class ProductStorageService:
     @classmethod
     def get_or_create_packaging_material(cls, cursor, tag: str) -> int:
         """Get or create packaging material and return ID"""
-        name = tag.replace('en:', '').replace('-', ' ').title()
-        slug = tag.replace('en:', '')
-
         cursor.execute(
             "SELECT id FROM packaging_materials WHERE tag = %s",
             (tag,)
@@ -238,6 +251,9 @@ class ProductStorageService:
         if result:
             return result[0]
 
+        slug = tag.removeprefix('en:')
+        name = slug.replace('-', ' ').title()
+
         # Default scores (can be improved with actual data)
         # Tuple: (recyclability, recycling_rate, biodegradability, transport, env_score, adjustment, co2_per_kg)
         scores = {
@@ -281,8 +297,6 @@ class ProductStorageService:
     @classmethod
     def get_or_create_packaging_shape(cls, cursor, tag: str) -> int:
         """Get or create packaging shape and return ID"""
-        name = tag.replace('en:', '').replace('-', ' ').title()
-
         cursor.execute(
             "SELECT id FROM packaging_shapes WHERE tag = %s",
             (tag,)
@@ -291,6 +305,8 @@ class ProductStorageService:
         if result:
             return result[0]
 
+        name = tag.removeprefix('en:').replace('-', ' ').title()
+
         cursor.execute(
             "INSERT INTO packaging_shapes (tag, name) VALUES (%s, %s) RETURNING id",
             (tag, name)
@@ -300,8 +316,6 @@ class ProductStorageService:
     @classmethod
     def get_or_create_recycling_instruction(cls, cursor, tag: str) -> int:
         """Get or create recycling instruction and return ID"""
-        name = tag.replace('en:', '').replace('-', ' ').title()
-
         cursor.execute(
             "SELECT id FROM recycling_instructions WHERE tag = %s",
             (tag,)
@@ -310,6 +324,8 @@ class ProductStorageService:
         if result:
             return result[0]
 
+        name = tag.removeprefix('en:').replace('-', ' ').title()
+
         cursor.execute(
             "INSERT INTO recycling_instructions (tag, name) VALUES (%s, %s) RETURNING id",
             (tag, name)
@@ -322,12 +338,9 @@ class ProductStorageService:
         Extract ISO country code from tag if possible
         Examples: en:united-states -> US, en:canada -> CA
         """
-        # Remove 'en:' prefix
-        country_name = tag.replace('en:', '').replace('-', ' ')
-
         # Try to extract 2-letter codes that are already in the tag
         # Some tags might be like "en:us" or "en:ca"
-        clean_tag = tag.replace('en:', '')
+        clean_tag = tag.removeprefix('en:')
         if len(clean_tag) == 2 and clean_tag.isalpha():
             return clean_tag.upper()
 
@@ -338,9 +351,6 @@ class ProductStorageService:
     @classmethod
     def get_or_create_country(cls, cursor, tag: str) -> int:
         """Get or create country and return ID"""
-        name = tag.replace('en:', '').replace('-', ' ').title()
-        code = cls.extract_country_code(tag)
-
         cursor.execute(
             "SELECT id FROM countries WHERE tag = %s",
             (tag,)
@@ -349,6 +359,9 @@ class ProductStorageService:
         if result:
             return result[0]
 
+        name = tag.removeprefix('en:').replace('-', ' ').title()
+        code = cls.extract_country_code(tag)
+
         cursor.execute(
             "INSERT INTO countries (tag, name, code) VALUES (%s, %s, %s) RETURNING id",
             (tag, name, code)
@@ -361,18 +374,18 @@ class ProductStorageService:
         Save complete product data to database
         Returns product ID
         """
-        with conn.cursor() as cursor:
-            # Helper to safely get values
-            def safe_get(data: dict, *keys, default=None):
-                for key in keys:
-                    if isinstance(data, dict):
-                        data = data.get(key)
-                    else:
-                        return default
-                    if data is None:
-                        return default
-                return data
+        return cls.save_product_row(conn, off_product)["id"]
 
+    @classmethod
+    def save_product_row(cls, conn, off_product: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Save complete product data to database (see save_product)
+        Returns the saved product in the same shape as the scan workflow's database
+        lookup, so callers don't have to read it back
+
+        All writes run in one transaction, so a failed save leaves no partial product
+        """
+        with conn.transaction(), conn.cursor() as cursor:
             # Helper to normalize grade values (must be single char or None)
             def normalize_grade(grade_value):
                 if not grade_value or grade_value == 'unknown':
@@ -391,193 +404,140 @@ class ProductStorageService:
             # 3. Parse location
             location = cls.parse_location(off_product.get('manufacturing_places'))
 
-            # 4. Check for palm oil
-            has_palm_oil = bool(off_product.get('ingredients_from_palm_oil_tags'))
+            # 4. Check for palm oil (set gives O(1) lookups in the ingredients loop)
+            palm_oil_tags = frozenset(off_product.get('ingredients_from_palm_oil_tags') or ())
+            has_palm_oil = bool(palm_oil_tags)
 
             # 5. Normalize grade values
             ecoscore_grade = normalize_grade(off_product.get('ecoscore_grade'))
             nutriscore_grade = normalize_grade(off_product.get('nutriscore_grade'))
 
-            # 6. Pre-calculate transportation data using default location
-            from flask import current_app
-            transportation_data = None
-            try:
-                # Only calculate if we have manufacturing location
-                if off_product.get('manufacturing_places'):
-                    from ..services.scoring_service import ScoringService
-                    # Calculate with default lat/lon from config
-                    default_lat = current_app.config.get('DEFAULT_STORE_LAT')
-                    default_lon = current_app.config.get('DEFAULT_STORE_LON')
-
-                    # This will be calculated once and cached
-                    # Note: We'll save to DB after product is created
-                    transportation_data = {
-                        'needs_calculation': True,
-                        'lat': default_lat,
-                        'lon': default_lon
-                    }
-            except Exception as e:
-                # Don't fail if transportation calculation fails
-                pass
-
             # 7. Insert or update product
+            # The hot statements in this method run with prepare=True so psycopg
+            # keeps a server-side prepared statement per connection and Postgres
+            # parses/plans them once instead of on every save.
             # Normalize barcode to EAN-13 (canonical form)
             upc = get_primary_barcode(off_product.get('code'))
 
-            # Check if product exists
-            cursor.execute("SELECT id FROM products WHERE upc = %s", (upc,))
-            existing = cursor.fetchone()
-
             # Extract price if available
             price = None
             price_info = off_product.get('price_info')
             if price_info:
                 price = price_info.get('price')
 
-            if existing:
-                # Update existing product
-                product_id = existing[0]
-                cursor.execute(
-                    """UPDATE products SET
-                       product_name = %s,
-                       brand_id = %s,
-                       quantity = %s,
-                       quantity_grams = %s,
-                       serving_size = %s,
-                       serving_size_grams = %s,
-                       nova_group = %s,
-                       food_groups_tags = %s,
-                       manufacturing_places = %s,
-                       manufacturing_city = %s,
-                       manufacturing_region = %s,
-                       manufacturing_country = %s,
-                       ingredients_text = %s,
-                       labels_text = %s,
-                       packaging_text = %s,
-                       has_palm_oil = %s,
-                       ecoscore_grade = %s,
-                       ecoscore_score = %s,
-                       nutriscore_grade = %s,
-                       completeness = %s,
-                       image_url = %s,
-                       image_small_url = %s,
-                       price = %s,
-                       price_updated_at = %s,
-                       raw_off_data = %s,
+            # Single UPSERT keyed on upc: no existence check, RETURNING id covers
+            # both the insert and the update case. Plain text fields (product_name,
+            # quantity, ingredients_text, image URLs, ...) are generated columns
+            # projected from raw_off_data by Postgres, so only values that need
+            # parsing in Python are bound alongside the JSONB payload.
+            cursor.execute(
+                """INSERT INTO products
+                   (upc, brand_id, quantity_grams, serving_size_grams, nova_group,
+                    food_groups_tags, manufacturing_city, manufacturing_region,
+                    manufacturing_country, has_palm_oil, ecoscore_grade, ecoscore_score,
+                    nutriscore_grade, completeness, price, price_updated_at, raw_off_data)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                   ON CONFLICT (upc) DO UPDATE SET
+                       brand_id = EXCLUDED.brand_id,
+                       quantity_grams = EXCLUDED.quantity_grams,
+                       serving_size_grams = EXCLUDED.serving_size_grams,
+                       nova_group = EXCLUDED.nova_group,
+                       food_groups_tags = EXCLUDED.food_groups_tags,
+                       manufacturing_city = EXCLUDED.manufacturing_city,
+                       manufacturing_region = EXCLUDED.manufacturing_region,
+                       manufacturing_country = EXCLUDED.manufacturing_country,
+                       has_palm_oil = EXCLUDED.has_palm_oil,
+                       ecoscore_grade = EXCLUDED.ecoscore_grade,
+                       ecoscore_score = EXCLUDED.ecoscore_score,
+                       nutriscore_grade = EXCLUDED.nutriscore_grade,
+                       completeness = EXCLUDED.completeness,
+                       price = EXCLUDED.price,
+                       price_updated_at = EXCLUDED.price_updated_at,
+                       raw_off_data = EXCLUDED.raw_off_data,
                        updated_at = NOW(),
                        last_updated_at = NOW()
-                       WHERE id = %s""",
-                    (
-                        off_product.get('product_name'),
-                        manufacturer_id,
-                        off_product.get('quantity'),
-                        quantity_grams,
-                        off_product.get('serving_size'),
-                        serving_size_grams,
-                        off_product.get('nova_group'),
-                        off_product.get('food_groups_tags', []),
-                        off_product.get('manufacturing_places'),
-                        location['city'],
-                        location['region'],
-                        location['country'],
-                        off_product.get('ingredients_text'),
-                        off_product.get('labels'),
-                        off_product.get('packaging'),
-                        has_palm_oil,
-                        ecoscore_grade,
-                        off_product.get('ecoscore_score'),
-                        nutriscore_grade,
-                        off_product.get('completeness'),
-                        off_product.get('image_front_url'),
-                        off_product.get('image_front_small_url'),
-                        price,
-                        datetime.now() if price is not None else None,
-                        json.dumps(off_product),  # Store complete OFF data
-                        product_id
-                    )
-                )
-            else:
-                # Insert new product
-                cursor.execute(
-                    """INSERT INTO products
-                       (upc, product_name, brand_id, quantity, quantity_grams,
-                        serving_size, serving_size_grams, nova_group, food_groups_tags,
-                        manufacturing_places, manufacturing_city, manufacturing_region,
-                        manufacturing_country, ingredients_text, labels_text, packaging_text,
-                        has_palm_oil, ecoscore_grade, ecoscore_score, nutriscore_grade,
-                        completeness, image_url, image_small_url, price, price_updated_at, raw_off_data)
-                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                       RETURNING id""",
-                    (
-                        upc,
-                        off_product.get('product_name'),
-                        manufacturer_id,
-                        off_product.get('quantity'),
-                        quantity_grams,
-                        off_product.get('serving_size'),
-                        serving_size_grams,
-                        off_product.get('nova_group'),
-                        off_product.get('food_groups_tags', []),
-                        off_product.get('manufacturing_places'),
-                        location['city'],
-                        location['region'],
-                        location['country'],
-                        off_product.get('ingredients_text'),
-                        off_product.get('labels'),
-                        off_product.get('packaging'),
-                        has_palm_oil,
-                        ecoscore_grade,
-                        off_product.get('ecoscore_score'),
-                        nutriscore_grade,
-                        off_product.get('completeness'),
-                        off_product.get('image_front_url'),
-                        off_product.get('image_front_small_url'),
-                        price,
-                        datetime.now() if price is not None else None,
-                        json.dumps(off_product)  # Store complete OFF data
-                    )
-                )
-                product_id = cursor.fetchone()[0]
+                   RETURNING id, upc, product_name, quantity, manufacturing_places,
+                             nova_group, ecoscore_grade, ecoscore_score,
+                             image_url, image_small_url, price::double precision""",
+                (
+                    upc,
+                    manufacturer_id,
+                    quantity_grams,
+                    serving_size_grams,
+                    off_product.get('nova_group'),
+                    off_product.get('food_groups_tags', []),
+                    location['city'],
+                    location['region'],
+                    location['country'],
+                    has_palm_oil,
+                    ecoscore_grade,
+                    off_product.get('ecoscore_score'),
+                    nutriscore_grade,
+                    off_product.get('completeness'),
+                    price,
+                    datetime.now() if price is not None else None,
+                    Jsonb(off_product)  # Store complete OFF data
+                ),
+                prepare=True,
+            )
+            row = cursor.fetchone()
+            product_id = row[0]
+            product = {
+                "id": product_id,
+                "upc": row[1],
+                "product_name": row[2],
+                "brand": brand_name if manufacturer_id else None,
+                "quantity": row[3],
+                "manufacturing_places": row[4],
+                "primary_category": None,
+                "nova_group": row[5],
+                "ecoscore_grade": row[6],
+                "ecoscore_score": row[7],
+                "image_url": row[8],
+                "image_small_url": row[9],
+                "price": row[10],
+            }
 
             # 6. Save categories using UPSERT to prevent duplicates
             categories_tags = off_product.get('categories_tags', [])
+            en_categories = [(idx, tag) for idx, tag in enumerate(categories_tags) if tag.startswith('en:')]
+            category_ids = [
+                cls.get_or_create_category(cursor, tag, tag[3:].replace('-', ' ').title(), level=idx+1)
+                for idx, tag in en_categories
+            ]
+
+            # Remove categories that are no longer associated with this product first,
+            # so a stale primary row can't collide with the new primary on
+            # idx_one_primary_category. Surviving rows get is_primary rewritten by
+            # the upsert below, so no blanket "clear is_primary" UPDATE is needed.
+            if category_ids:
+                # Use ANY instead of IN with tuple
+                cursor.execute(
+                    "DELETE FROM product_categories WHERE product_id = %s AND category_id != ALL(%s)",
+                    (product_id, category_ids)
+                )
 
-            # First, clear is_primary for all existing categories for this product
-            cursor.execute(
-                "UPDATE product_categories SET is_primary = FALSE WHERE product_id = %s",
-                (product_id,)
-            )
-
-            for idx, tag in enumerate(categories_tags):
-                if tag.startswith('en:'):
-                    name = tag.replace('en:', '').replace('-', ' ').title()
-                    category_id = cls.get_or_create_category(cursor, tag, name, level=idx+1)
-                    is_primary = (idx == len(categories_tags) - 1)  # Last one is primary
-
-                    # Use ON CONFLICT to prevent duplicates
-                    cursor.execute(
-                        """INSERT INTO product_categories (product_id, category_id, is_primary, position)
-                           VALUES (%s, %s, %s, %s)
-                           ON CONFLICT (product_id, category_id)
-                           DO UPDATE SET is_primary = EXCLUDED.is_primary, position = EXCLUDED.position""",
-                        (product_id, category_id, is_primary, idx)
-                    )
+            for (idx, tag), category_id in zip(en_categories, category_ids):
+                is_primary = (idx == len(categories_tags) - 1)  # Last one is primary
+                if is_primary:
+                    # Category names are only ever derived from the tag (see get_or_create_category)
+                    product["primary_category"] = tag[3:].replace('-', ' ').title()
 
-            # Remove categories that are no longer associated with this product
-            if categories_tags:
-                category_ids = [cls.get_or_create_category(cursor, tag, tag.replace('en:', '').replace('-', ' ').title(), level=idx+1)
-                               for idx, tag in enumerate(categories_tags) if tag.startswith('en:')]
-                if category_ids:
-                    # Use ANY instead of IN with tuple
-                    cursor.execute(
-                        "DELETE FROM product_categories WHERE product_id = %s AND category_id != ALL(%s)",
-                        (product_id, category_ids)
-                    )
+                # Use ON CONFLICT to prevent duplicates
+                cursor.execute(
+                    """INSERT INTO product_categories (product_id, category_id, is_primary, position)
+                       VALUES (%s, %s, %s, %s)
+                       ON CONFLICT (product_id, category_id)
+                       DO UPDATE SET is_primary = EXCLUDED.is_primary, position = EXCLUDED.position""",
+                    (product_id, category_id, is_primary, idx)
+                )
 
             # 7. Save food groups using UPSERT to prevent duplicates
             food_groups_tags = off_product.get('food_groups_tags', [])
+            food_group_ids = []
             for idx, tag in enumerate(food_groups_tags):
                 food_group_id = cls.get_or_create_food_group(cursor, tag)
+                food_group_ids.append(food_group_id)
                 cursor.execute(
                     """INSERT INTO product_food_groups (product_id, food_group_id, position)
                        VALUES (%s, %s, %s)
@@ -586,19 +546,9 @@ class ProductStorageService:
                     (product_id, food_group_id, idx)
                 )
 
-            # Remove food groups no longer associated
-            if food_groups_tags:
-                food_group_ids = [cls.get_or_create_food_group(cursor, tag) for tag in food_groups_tags]
-                if food_group_ids:
-                    cursor.execute(
-                        "DELETE FROM product_food_groups WHERE product_id = %s AND food_group_id != ALL(%s)",
-                        (product_id, food_group_ids)
-                    )
-
             # 8. Save ingredients using UPSERT to prevent duplicates
             ingredients = off_product.get('ingredients', [])
-            palm_oil_tags = off_product.get('ingredients_from_palm_oil_tags', [])
-            additives_tags = off_product.get('additives_tags', [])
+            additives_tags = frozenset(off_product.get('additives_tags') or ())
 
             ingredient_ids_list = []
             for idx, ingredient in enumerate(ingredients):
@@ -612,7 +562,7 @@ class ProductStorageService:
                     # Extract E-number if it's an additive
                     additive_code = None
                     if is_additive and tag.startswith('en:e'):
-                        additive_code = tag.replace('en:', '').upper()
+                        additive_code = tag[3:].upper()
 
                     ingredient_id = cls.get_or_create_ingredient(
                         cursor, tag, vegan, vegetarian, is_palm, is_additive, additive_code
@@ -648,13 +598,6 @@ class ProductStorageService:
                         )
                     )
 
-            # Remove ingredients no longer in the product
-            if ingredient_ids_list:
-                cursor.execute(
-                    "DELETE FROM product_ingredients WHERE product_id = %s AND ingredient_id != ALL(%s)",
-                    (product_id, ingredient_ids_list)
-                )
-
             # 9. Save allergens using UPSERT to prevent duplicates
             allergens_tags = off_product.get('allergens_tags', [])
             allergen_ids_list = []
@@ -668,13 +611,6 @@ class ProductStorageService:
                     (product_id, allergen_id)
                 )
 
-            # Remove allergens no longer associated
-            if allergen_ids_list:
-                cursor.execute(
-                    "DELETE FROM product_allergens WHERE product_id = %s AND allergen_id != ALL(%s)",
-                    (product_id, allergen_ids_list)
-                )
-
             # 10. Save labels using UPSERT to prevent duplicates
             labels_tags = off_product.get('labels_tags', [])
             label_ids_list = []
@@ -688,43 +624,61 @@ class ProductStorageService:
                     (product_id, label_id)
                 )
 
-            # Remove labels no longer associated
-            if label_ids_list:
-                cursor.execute(
-                    "DELETE FROM product_labels WHERE product_id = %s AND label_id != ALL(%s)",
-                    (product_id, label_ids_list)
-                )
-
-            # 11. Save packaging - delete and re-insert (no natural key for ON CONFLICT)
-            cursor.execute("DELETE FROM packagings WHERE product_id = %s", (product_id,))
-
+            # 11. Save packaging - diff-based UPSERT keyed on a content hash, so an
+            # unchanged packaging list writes nothing
             packagings = off_product.get('packagings', [])
+            packaging_rows = []
+            packaging_hashes = []
+            seen_contents: Dict[str, int] = {}
             for packaging in packagings:
                 material_tag = packaging.get('material', '')
                 shape_tag = packaging.get('shape', '')
                 recycling_tag = packaging.get('recycling', '')
+                number_of_units = packaging.get('number_of_units', 1)
+
+                # Identical components on one product get distinct hashes via
+                # their occurrence index
+                content = f"{material_tag}|{shape_tag}|{recycling_tag}|{number_of_units}"
+                occurrence = seen_contents.get(content, 0)
+                seen_contents[content] = occurrence + 1
+                content_hash = hashlib.sha1(f"{content}|{occurrence}".encode()).digest()
+                packaging_hashes.append(content_hash)
 
                 material_id = cls.get_or_create_packaging_material(cursor, material_tag) if material_tag else None
                 shape_id = cls.get_or_create_packaging_shape(cursor, shape_tag) if shape_tag else None
                 recycling_id = cls.get_or_create_recycling_instruction(cursor, recycling_tag) if recycling_tag else None
 
-                cursor.execute(
+                packaging_rows.append((
+                    product_id,
+                    material_id,
+                    shape_id,
+                    recycling_id,
+                    number_of_units,
+                    material_tag,
+                    shape_tag,
+                    recycling_tag,
+                    content_hash
+                ))
+
+            if packaging_rows:
+                cursor.executemany(
                     """INSERT INTO packagings
                        (product_id, material_id, shape_id, recycling_id, number_of_units,
-                        material_text, shape_text, recycling_text)
-                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
-                    (
-                        product_id,
-                        material_id,
-                        shape_id,
-                        recycling_id,
-                        packaging.get('number_of_units', 1),
-                        material_tag,
-                        shape_tag,
-                        recycling_tag
-                    )
+                        material_text, shape_text, recycling_text, content_hash)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                       ON CONFLICT (product_id, content_hash) DO NOTHING""",
+                    packaging_rows
                 )
 
+            # Remove packagings no longer present (rows saved before content_hash
+            # existed have a NULL hash and are replaced here)
+            cursor.execute(
+                """DELETE FROM packagings
+                   WHERE product_id = %s
+                     AND (content_hash IS NULL OR content_hash != ALL(%s::bytea[]))""",
+                (product_id, packaging_hashes)
+            )
+
             # 12. Save nutriments using UPSERT (primary key is product_id)
             nutriments = off_product.get('nutriments', {})
             cursor.execute(
@@ -756,7 +710,8 @@ class ProductStorageService:
                     nutriments.get('salt_100g'),
                     nutriments.get('saturated-fat_100g'),
                     nutriments.get('sodium_100g')
-                )
+                ),
+                prepare=True,
             )
 
             # 13. Save countries using UPSERT
@@ -773,12 +728,104 @@ class ProductStorageService:
                     (product_id, country_id, 'sold_in', idx)
                 )
 
-            # Remove countries no longer associated
-            if country_ids_list:
-                cursor.execute(
-                    "DELETE FROM product_countries WHERE product_id = %s AND country_id != ALL(%s) AND relation = 'sold_in'",
-                    (product_id, country_ids_list)
-                )
+            # 14. Remove food groups, ingredients, allergens, labels and countries
+            # no longer associated, in one round-trip. Each data-modifying CTE
+            # runs unconditionally, so an empty id list (nothing saved for that
+            # relation) must skip deletion rather than match every row.
+            cursor.execute(
+                """WITH
+                   d_food_groups AS (
+                       DELETE FROM product_food_groups
+                       WHERE product_id = %(product_id)s
+                         AND cardinality(%(food_group_ids)s::int[]) > 0
+                         AND food_group_id != ALL(%(food_group_ids)s::int[])
+                   ),
+                   d_ingredients AS (
+                       DELETE FROM product_ingredients
+                       WHERE product_id = %(product_id)s
+                         AND cardinality(%(ingredient_ids)s::int[]) > 0
+                         AND ingredient_id != ALL(%(ingredient_ids)s::int[])
+                   ),
+                   d_allergens AS (
+                       DELETE FROM product_allergens
+                       WHERE product_id = %(product_id)s
+                         AND cardinality(%(allergen_ids)s::int[]) > 0
+                         AND allergen_id != ALL(%(allergen_ids)s::int[])
+                   ),
+                   d_labels AS (
+                       DELETE FROM product_labels
+                       WHERE product_id = %(product_id)s
+                         AND cardinality(%(label_ids)s::int[]) > 0
+                         AND label_id != ALL(%(label_ids)s::int[])
+                   ),
+                   d_countries AS (
+                       DELETE FROM product_countries
+                       WHERE product_id = %(product_id)s
+                         AND relation = 'sold_in'
+                         AND cardinality(%(country_ids)s::int[]) > 0
+                         AND country_id != ALL(%(country_ids)s::int[])
+                   )
+                   SELECT 1""",
+                {
+                    'product_id': product_id,
+                    'food_group_ids': food_group_ids,
+                    'ingredient_ids': ingredient_ids_list,
+                    'allergen_ids': allergen_ids_list,
+                    'label_ids': label_ids_list,
+                    'country_ids': country_ids_list,
+                },
+                prepare=True,
+            )
+
+            # 15. Precomputed scan scores are recomputed on the next scan
+            cursor.execute("DELETE FROM product_scores WHERE product_id = %s", (product_id,), prepare=True)
+
+        # 16. Refresh the cached recommendation scores once the save is committed
+        from .recommendation_service import RecommendationService
+        from .scoring_service import ScoringService
+        ScoringService.invalidate_cached_scores(product_id)
+        try:
+            RecommendationService.refresh_cached_scores(product_id)
+        except Exception as exc:
+            # Don't fail the save; the scores are recomputed on read while NULL
+            current_app.logger.warning(f"[Storage] Failed to cache scores for product {product_id}: {exc}")
+
+        return product
 
-            conn.commit()
-            return product_id
+    @classmethod
+    def save_products_parallel(cls, off_products: List[Dict[str, Any]], workers: int = 8,
+                               chunk_size: int = 25) -> List[Optional[int]]:
+        """
+        Save a batch of OFF products concurrently for bulk ingest.
+
+        Products are split into chunks; each worker pushes its own app context,
+        checks a connection out of the shared pool and saves the products of its
+        chunk one after another. Each product is saved in its own transaction
+        (see save_product_row), so a failed product is rolled back on its own.
+
+        Returns product IDs in input order (None for products that failed)
+        """
+        if not off_products:
+            return []
+
+        app = current_app._get_current_object()
+        chunks = [off_products[i:i + chunk_size] for i in range(0, len(off_products), chunk_size)]
+
+        def save_chunk(chunk: List[Dict[str, Any]]) -> List[Optional[int]]:
+            ids: List[Optional[int]] = []
+            # The app context's request-scoped connection is reused by the score
+            # refresh in save_product and returned to the pool on teardown
+            with app.app_context():
+                conn = get_connection()
+                for off_product in chunk:
+                    try:
+                        ids.append(cls.save_product(conn, off_product))
+                    except Exception as exc:
+                        app.logger.warning(f"[Storage] Failed to save product {off_product.get('code')}: {exc}")
+                        ids.append(None)
+            return ids
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as executor:
+            results = executor.map(save_chunk, chunks)
+
+        return [product_id for chunk_ids in results for product_id in chunk_ids]
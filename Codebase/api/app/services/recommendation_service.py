@@ -1,21 +1,46 @@
 """Service for product recommendations based on sustainability and health."""
 
 import asyncio
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import Dict, Any, List, NamedTuple, Optional
 from flask import current_app
+from psycopg.rows import class_row, dict_row
 
 from ..db import get_connection
 from .open_food_facts import OpenFoodFactsService
 from .product_storage import ProductStorageService
 from .scoring_service import ScoringService
 from .ingredient_analysis_service import IngredientAnalysisService
+from ..utils.barcode import get_primary_barcode
+
+
+@lru_cache(maxsize=1024)
+def _category_to_tag(category: str) -> str:
+    """Convert a category name to OFF tag format (e.g., "Canned Meats" -> "canned-meats")."""
+    return category.lower().replace(' ', '-')
+
+
+class SimilarProduct(NamedTuple):
+    """A recommendation candidate with its cached scores (None until scored)."""
+    id: int
+    upc: str
+    product_name: Optional[str]
+    brand: Optional[str]
+    category: Optional[str]
+    image_small_url: Optional[str]
+    price: Optional[float]
+    sustainability_score: Optional[int] = None
+    grade: Optional[str] = None
+    harmful_ingredients: Optional[int] = None
+    caution_ingredients: Optional[int] = None
+    recommendation_score: Optional[int] = None
 
 
 class RecommendationService:
     """Service for finding and ranking product recommendations."""
 
     @classmethod
-    def get_similar_products_from_db(cls, product_id: int, category: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_similar_products_from_db(cls, product_id: int, category: str, limit: int = 10) -> List[SimilarProduct]:
         """
         Find similar products in local database by category.
 
@@ -25,16 +50,23 @@ class RecommendationService:
             limit: Maximum number of products to return
 
         Returns:
-            List of similar products with basic info
+            List of similar products with basic info and their cached scores
+            (recommendation_score is None when the product has not been scored yet)
         """
         if not category:
             return []
 
         conn = get_connection()
-        with conn.cursor() as cursor:
+        with conn.cursor(row_factory=class_row(SimilarProduct)) as cursor:
+            # Hot path for every recommendation request: prepare so the plan is
+            # cached server-side on each pooled connection
             cursor.execute(
                 """SELECT p.id, p.upc, p.product_name, m.name as brand,
-                          c.name as category, p.image_small_url, p.price
+                          c.name as category, p.image_small_url,
+                          p.price::double precision as price,
+                          p.sustainability_score, p.sustainability_grade as grade,
+                          p.harmful_ingredients, p.caution_ingredients,
+                          p.recommendation_score
                    FROM products p
                    LEFT JOIN manufacturers m ON p.brand_id = m.id
                    LEFT JOIN product_categories pc ON p.id = pc.product_id AND pc.is_primary = TRUE
@@ -42,27 +74,77 @@ class RecommendationService:
                    WHERE c.name = %s
                      AND p.id != %s
                    LIMIT %s""",
-                (category, product_id, limit)
+                (category, product_id, limit),
+                prepare=True
+            )
+            return cursor.fetchall()
+
+    @classmethod
+    def get_better_products_from_db(cls, product_id: int, category: str, current_score: float,
+                                    candidate_ids: Optional[List[int]] = None,
+                                    limit: int = 3) -> List[Dict[str, Any]]:
+        """
+        Find the best-scoring products that beat the current score, ranked in SQL.
+
+        Uses the cached recommendation scores on the products table, so filtering,
+        sorting, top-K and the reason text are computed by Postgres.
+
+        Args:
+            product_id: Current product ID to exclude
+            category: Primary category to match
+            current_score: Current product's recommendation score
+            candidate_ids: Extra product IDs to consider regardless of primary category
+                (e.g. products just fetched from Open Food Facts)
+            limit: Maximum number of products to return
+
+        Returns:
+            List of better products with scores, improvement and reason
+        """
+        if not category and not candidate_ids:
+            return []
+
+        conn = get_connection()
+        with conn.cursor(row_factory=dict_row) as cursor:
+            cursor.execute(
+                """SELECT p.upc, p.product_name, m.name as brand,
+                          c.name as category, p.image_small_url,
+                          p.price::double precision as price,
+                          p.sustainability_score, p.sustainability_grade as grade,
+                          p.harmful_ingredients,
+                          round((p.recommendation_score - %(current_score)s)::numeric, 1)::float8
+                              AS score_improvement,
+                          CASE
+                              WHEN p.recommendation_score - %(current_score)s >= 20
+                                  THEN 'Significantly better sustainability score'
+                              WHEN p.recommendation_score - %(current_score)s >= 10
+                                  THEN 'Better sustainability score'
+                              ELSE 'Slightly better sustainability score'
+                          END
+                          || CASE WHEN p.harmful_ingredients = 0
+                                  THEN ' - no harmful ingredients' ELSE '' END AS reason
+                   FROM products p
+                   LEFT JOIN manufacturers m ON p.brand_id = m.id
+                   LEFT JOIN product_categories pc ON p.id = pc.product_id AND pc.is_primary = TRUE
+                   LEFT JOIN categories c ON pc.category_id = c.id
+                   WHERE (c.name = %(category)s OR p.id = ANY(%(candidate_ids)s))
+                     AND p.id != %(product_id)s
+                     AND p.recommendation_score > %(current_score)s
+                   ORDER BY p.recommendation_score DESC
+                   LIMIT %(limit)s""",
+                {
+                    "current_score": float(current_score),
+                    "category": category,
+                    "candidate_ids": candidate_ids or [],
+                    "product_id": product_id,
+                    "limit": limit
+                },
+                prepare=True
             )
-            results = cursor.fetchall()
-
-        similar = []
-        for row in results:
-            similar.append({
-                "id": row[0],
-                "upc": row[1],
-                "product_name": row[2],
-                "brand": row[3],
-                "category": row[4],
-                "image_small_url": row[5],
-                "price": float(row[6]) if row[6] is not None else None
-            })
-
-        return similar
+            return cursor.fetchall()
 
     @classmethod
     async def fetch_and_save_similar_products(cls, category: str, exclude_upcs: List[str],
-                                               needed: int = 10) -> List[Dict[str, Any]]:
+                                               needed: int = 10) -> List[SimilarProduct]:
         """
         Fetch similar products from Open Food Facts API and save to database.
 
@@ -72,13 +154,13 @@ class RecommendationService:
             needed: Number of new products needed
 
         Returns:
-            List of newly saved products with IDs
+            List of newly saved products with IDs (scores are cached on save
+            but not loaded here)
         """
         if not category:
             return []
 
-        # Convert category name to tag format (e.g., "Canned Meats" -> "canned-meats")
-        category_tag = category.lower().replace(' ', '-')
+        category_tag = _category_to_tag(category)
 
         current_app.logger.info(f"[Recommendations] Searching OFF API for category: {category_tag}")
 
@@ -98,39 +180,48 @@ class RecommendationService:
         conn = get_connection()
         saved_products = []
 
-        for off_product in off_products:
-            # Skip if we already have this product
-            upc = off_product.get('code')
-            if not upc or upc in exclude_upcs:
-                continue
+        # Canonicalize each OFF code once (stored UPCs are in canonical EAN-13 form)
+        exclude_set = set(exclude_upcs)
+        candidates = [
+            (get_primary_barcode(p['code']), p) for p in off_products if p.get('code')
+        ]
+        candidates = [(upc, p) for upc, p in candidates if upc not in exclude_set]
 
-            # Check if already in DB
-            with conn.cursor() as cursor:
-                cursor.execute("SELECT id FROM products WHERE upc = %s", (upc,))
-                if cursor.fetchone():
-                    continue
+        # Check which candidates are already in DB with a single query
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT upc FROM products WHERE upc = ANY(%s)",
+                ([upc for upc, _ in candidates],)
+            )
+            exclude_set.update(row[0] for row in cursor.fetchall())
 
-            # Save to database
-            try:
-                product_id = ProductStorageService.save_product(conn, off_product)
-                current_app.logger.info(f"[Recommendations] Saved product {upc} with ID {product_id}")
-
-                saved_products.append({
-                    "id": product_id,
-                    "upc": upc,
-                    "product_name": off_product.get('product_name'),
-                    "brand": off_product.get('brands'),
-                    "category": category,
-                    "image_small_url": off_product.get('image_front_small_url')
-                })
+        to_save = []
+        for canonical_upc, off_product in candidates:
+            # Skip products we already have (or already queued, as OFF can repeat codes)
+            if canonical_upc in exclude_set:
+                continue
+            exclude_set.add(canonical_upc)
+            to_save.append(off_product)
+            if len(to_save) >= needed:
+                break
 
-                # Stop when we have enough
-                if len(saved_products) >= needed:
-                    break
+        # Save the whole batch at once (on pooled worker connections, off the event
+        # loop); failed products come back as None and are skipped
+        product_ids = await asyncio.to_thread(ProductStorageService.save_products_parallel, to_save)
 
-            except Exception as e:
-                current_app.logger.warning(f"[Recommendations] Failed to save product {upc}: {e}")
+        for off_product, product_id in zip(to_save, product_ids):
+            if product_id is None:
                 continue
+            current_app.logger.info(f"[Recommendations] Saved product {off_product['code']} with ID {product_id}")
+            saved_products.append(SimilarProduct(
+                id=product_id,
+                upc=off_product['code'],
+                product_name=off_product.get('product_name'),
+                brand=off_product.get('brands'),
+                category=category,
+                image_small_url=off_product.get('image_front_small_url'),
+                price=None
+            ))
 
         current_app.logger.info(f"[Recommendations] Saved {len(saved_products)} new products to DB")
         return saved_products
@@ -141,7 +232,9 @@ class RecommendationService:
         """
         Calculate comprehensive recommendation score for a product.
 
-        Uses cached transportation score from database for speed.
+        Reads the scores cached on the products row at write time (see
+        refresh_cached_scores); products that were never scored are scored and
+        cached now.
 
         Args:
             product_id: Product ID
@@ -151,45 +244,68 @@ class RecommendationService:
         Returns:
             Dictionary with scores and ranking metrics
         """
-        from ..db import get_connection
+        conn = get_connection()
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """SELECT sustainability_score, sustainability_grade,
+                          harmful_ingredients, caution_ingredients, recommendation_score,
+                          raw_materials_score, packaging_score,
+                          COALESCE(transportation_score, 0), climate_score
+                   FROM products WHERE id = %s""",
+                (product_id,),
+                prepare=True
+            )
+            row = cursor.fetchone()
 
-        # Calculate sustainability score
-        raw_materials = ScoringService.calculate_raw_materials_score(product_id)
-        raw_points = raw_materials.get("points", 0) if isinstance(raw_materials.get("points"), (int, float)) else 0
+        if not row or row[4] is None:
+            return cls.refresh_cached_scores(product_id)
 
-        packaging = ScoringService.calculate_packaging_score(product_id)
-        packaging_points = packaging.get("points", 0) if isinstance(packaging.get("points"), (int, float)) else 0
+        return {
+            "sustainability_score": row[0],
+            "grade": row[1],
+            "harmful_ingredients": row[2],
+            "caution_ingredients": row[3],
+            "health_penalty": row[2] * 5 + row[3] * 2,
+            "recommendation_score": row[4],
+            "raw_materials_points": row[5],
+            "packaging_points": row[6],
+            "transportation_points": row[7],
+            "climate_points": row[8]
+        }
 
-        # Get cached transportation score from database (fast!)
+    @classmethod
+    def _compute_recommendation_score(cls, product_id: int) -> Dict[str, Any]:
+        """Calculate the recommendation score from the scoring inputs (uncached)."""
+        # Queue the harmful/caution ingredient counts in the same pipeline as the
+        # sustainability inputs (including the cached transportation score), so
+        # all independent queries go out together and cost a single round-trip
         conn = get_connection()
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT transportation_score FROM products WHERE id = %s", (product_id,))
-            result = cursor.fetchone()
-            transportation_points = result[0] if result and result[0] is not None else 0
-
-        climate = ScoringService.calculate_climate_efficiency_score(product_id)
-        climate_points = climate.get("points", 0) if isinstance(climate.get("points"), (int, float)) else 0
+        with conn.pipeline():
+            with conn.cursor() as flags_cursor:
+                flags_cursor.execute(
+                    IngredientAnalysisService.FLAGGED_COUNTS_SQL, (product_id,), prepare=True
+                )
+                components = ScoringService.calculate_sustainability_components(product_id)
+                harmful_count, caution_count = flags_cursor.fetchone()
+
+        return cls._combine_scores(components, harmful_count, caution_count)
+
+    @staticmethod
+    def _combine_scores(components: Dict[str, Any], harmful_count: int,
+                        caution_count: int) -> Dict[str, Any]:
+        """Combine sustainability components and ingredient counts into a recommendation score."""
+        # Every component reports numeric points (0 when data is missing)
+        raw_points = components["raw_materials"]["points"]
+        packaging_points = components["packaging"]["points"]
+        transportation_points = components["transportation_points"]
+        climate_points = components["climate_efficiency"]["points"]
 
         # Calculate total sustainability score (0-100) with all 4 metrics
         total_points = raw_points + packaging_points + transportation_points + climate_points
         sustainability_score = max(0, min(100, 50 + total_points))
 
         # Calculate grade
-        if sustainability_score >= 80:
-            grade = "A"
-        elif sustainability_score >= 60:
-            grade = "B"
-        elif sustainability_score >= 40:
-            grade = "C"
-        elif sustainability_score >= 20:
-            grade = "D"
-        else:
-            grade = "E"
-
-        # Get ingredient health analysis
-        ingredients = IngredientAnalysisService.analyze_ingredients(product_id)
-        harmful_count = ingredients.get("summary", {}).get("harmful", 0)
-        caution_count = ingredients.get("summary", {}).get("caution", 0)
+        grade = ScoringService.score_to_grade(sustainability_score)
 
         # Calculate health penalty (reduce score for harmful ingredients)
         health_penalty = (harmful_count * 5) + (caution_count * 2)
@@ -203,8 +319,87 @@ class RecommendationService:
             "harmful_ingredients": harmful_count,
             "caution_ingredients": caution_count,
             "health_penalty": health_penalty,
-            "recommendation_score": recommendation_score
+            "recommendation_score": recommendation_score,
+            "raw_materials_points": raw_points,
+            "packaging_points": packaging_points,
+            "transportation_points": transportation_points,
+            "climate_points": climate_points
+        }
+
+    @classmethod
+    def refresh_cached_scores(cls, product_id: int) -> Dict[str, Any]:
+        """
+        Recompute the recommendation score for a product and cache it on the products row.
+
+        Called whenever a product is saved, and by `flask refresh-scores` when
+        emission factors or scoring rules change.
+
+        Args:
+            product_id: Product ID
+
+        Returns:
+            The freshly calculated scores
+        """
+        scores = cls._compute_recommendation_score(product_id)
+        cls._store_cached_scores({product_id: scores})
+        return scores
+
+    @classmethod
+    def refresh_cached_scores_bulk(cls, product_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Recompute and cache recommendation scores for many products at once.
+
+        Scoring inputs and ingredient counts are fetched for the whole set with
+        ANY(%s) queries instead of per product.
+
+        Args:
+            product_ids: Product IDs
+
+        Returns:
+            Mapping of product ID to its freshly calculated scores
+        """
+        components = ScoringService.calculate_sustainability_components_bulk(product_ids)
+        health_counts = IngredientAnalysisService.count_health_classifications(product_ids)
+
+        all_scores = {
+            pid: cls._combine_scores(product_components, *health_counts.get(pid, (0, 0)))
+            for pid, product_components in components.items()
         }
+        cls._store_cached_scores(all_scores)
+        return all_scores
+
+    @staticmethod
+    def _store_cached_scores(all_scores: Dict[int, Dict[str, Any]]) -> None:
+        """Write calculated scores to the cached score columns on products."""
+        conn = get_connection()
+        with conn.cursor() as cursor:
+            cursor.executemany(
+                """UPDATE products SET
+                       sustainability_score = %s,
+                       sustainability_grade = %s,
+                       harmful_ingredients = %s,
+                       caution_ingredients = %s,
+                       recommendation_score = %s,
+                       raw_materials_score = %s,
+                       packaging_score = %s,
+                       climate_score = %s,
+                       scores_updated_at = NOW()
+                   WHERE id = %s""",
+                [
+                    (
+                        scores["sustainability_score"],
+                        scores["grade"],
+                        scores["harmful_ingredients"],
+                        scores["caution_ingredients"],
+                        scores["recommendation_score"],
+                        scores["raw_materials_points"],
+                        scores["packaging_points"],
+                        scores["climate_points"],
+                        pid
+                    )
+                    for pid, scores in all_scores.items()
+                ]
+            )
 
     @classmethod
     async def get_recommendations(cls, product_id: int, category: str, current_score: float,
@@ -228,66 +423,52 @@ class RecommendationService:
         local_products = cls.get_similar_products_from_db(product_id, category, limit=20)
         current_app.logger.info(f"[Recommendations] Found {len(local_products)} similar products in local DB")
 
+        # Candidates already in the DB that have no cached scores yet
+        # (products saved from OFF below get theirs from save_product)
+        unscored_ids = [p.id for p in local_products if p.recommendation_score is None]
+
         # Step 2: If we don't have enough, fetch from Open Food Facts
         if len(local_products) < min_count:
             needed = min_count - len(local_products)
-            exclude_upcs = [p["upc"] for p in local_products]
+            exclude_upcs = [p.upc for p in local_products]
 
             new_products = await cls.fetch_and_save_similar_products(category, exclude_upcs, needed)
             local_products.extend(new_products)
 
-        # Step 3: Calculate scores for all products (in parallel for speed)
-        scored_products = []
-        for product in local_products:
+        # Step 3: Score candidates that have no cached scores yet, as one batch
+        # (cached so ranking below and the next request read them directly)
+        if unscored_ids:
             try:
-                scores = cls.calculate_recommendation_score(product["id"])
-
-                # Only recommend products with better scores
-                if scores["recommendation_score"] > current_score:
-                    scored_products.append({
-                        **product,
-                        **scores
-                    })
+                cls.refresh_cached_scores_bulk(unscored_ids)
             except Exception as e:
-                current_app.logger.warning(f"[Recommendations] Error scoring product {product['id']}: {e}")
-                continue
+                current_app.logger.warning(f"[Recommendations] Error scoring candidates {unscored_ids}: {e}")
 
-        # Step 4: Sort by recommendation score (highest first)
-        scored_products.sort(key=lambda x: x["recommendation_score"], reverse=True)
-
-        # Step 5: Build recommendation response with reasons
-        recommendations = []
-        for product in scored_products[:3]:  # Top 3
-            reason_parts = []
-
-            # Determine primary reason
-            score_diff = product["recommendation_score"] - current_score
-            if score_diff >= 20:
-                reason_parts.append("Significantly better sustainability score")
-            elif score_diff >= 10:
-                reason_parts.append("Better sustainability score")
-            else:
-                reason_parts.append("Slightly better sustainability score")
-
-            # Add health reason if applicable
-            if product["harmful_ingredients"] == 0:
-                reason_parts.append("no harmful ingredients")
+        # Step 4: Filter, sort and pick the top 3 better products in SQL
+        # (products that failed to score keep NULL scores and are skipped)
+        candidate_ids = [p.id for p in local_products]
+        better_products = cls.get_better_products_from_db(
+            product_id, category, current_score, candidate_ids, limit=3
+        )
 
-            recommendations.append({
+        # Step 5: Build recommendation response
+        recommendations = [
+            {
                 "product": {
                     "upc": product["upc"],
                     "product_name": product["product_name"],
                     "brand": product["brand"],
                     "category": product["category"],
                     "image_small_url": product["image_small_url"],
-                    "price": product.get("price")
+                    "price": product["price"]
                 },
                 "sustainability_score": product["sustainability_score"],
                 "grade": product["grade"],
                 "harmful_ingredients": product["harmful_ingredients"],
-                "reason": " - ".join(reason_parts),
-                "score_improvement": round(score_diff, 1)
-            })
+                "reason": product["reason"],
+                "score_improvement": product["score_improvement"]
+            }
+            for product in better_products
+        ]
 
         current_app.logger.info(f"[Recommendations] Returning {len(recommendations)} recommendations")
         return recommendations
@@ -1,131 +1,524 @@
 from __future__ import annotations
 
-from decimal import Decimal
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+import copy
+import functools
+import threading
+import time
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Set, Tuple
+
+from flask import current_app, g, has_app_context
+from psycopg import Connection
 
 from ..db import get_connection
+from .geocoding_service import GeocodingService
+
+_G_SCORE_CACHE_KEY = "score_cache"
+
+# Process-wide scores shared across requests: key -> (expires_at, result), in
+# least-recently-used order. Entries are dropped by
+# ScoringService.invalidate_cached_scores when a product is re-saved; the TTL
+# bounds staleness for writes made by other workers. Callers get deep copies, so
+# mutating a returned score never alters the cached one. Keys are also indexed
+# by product_id for invalidation; both structures are guarded by the lock
+# because scoring runs on worker threads (batch saves, background prefetch).
+_SCORE_CACHE: Dict[Tuple, Tuple[float, Dict[str, Any]]] = {}
+_SCORE_CACHE_KEYS: Dict[int, Set[Tuple]] = {}
+_SCORE_CACHE_TTL = 600
+_SCORE_CACHE_MAXSIZE = 10_000
+_score_cache_lock = threading.Lock()
+
+# Coordinates are rounded to 2 decimals (~1 km) before scoring so nearby users share
+# entries, and a cached result only ever reflects the rounded location it is keyed by
+_COORD_DECIMALS = 2
+
+
+def _round_coord(value: Any) -> Any:
+    return round(value, _COORD_DECIMALS) if isinstance(value, float) else value
+
+
+def _memoize_scores(func: Callable) -> Callable:
+    """
+    Cache a product_id-keyed scoring classmethod on flask.g and in a TTL cache.
+
+    The flask.g layer lives as long as the app context; the process-wide LRU
+    layer keeps hot products cached across requests for _SCORE_CACHE_TTL
+    seconds. Float arguments (user coordinates) are rounded before both the key
+    and the call, so the result matches its key; a ``conn`` keyword is passed
+    through but is not part of the key.
+    """
+    @functools.wraps(func)
+    def wrapper(cls, product_id: int, *args: Any, **options: Any) -> Dict[str, Any]:
+        args = tuple(_round_coord(arg) for arg in args)
+        options = {name: _round_coord(value) for name, value in options.items()}
+        key = (
+            func.__name__,
+            product_id,
+            *args,
+            *sorted((name, value) for name, value in options.items() if name != "conn"),
+        )
+
+        request_cache = g.setdefault(_G_SCORE_CACHE_KEY, {}) if has_app_context() else {}
+        if key in request_cache:
+            return copy.deepcopy(request_cache[key])
+
+        now = time.monotonic()
+        with _score_cache_lock:
+            cached = _SCORE_CACHE.pop(key, None)
+            if cached and cached[0] > now:
+                # Re-inserted at the end: most recently used
+                _SCORE_CACHE[key] = cached
+            elif cached:
+                _drop_cached_score(key)
+                cached = None
+
+        if cached:
+            result = cached[1]
+        else:
+            result = func(cls, product_id, *args, **options)
+            with _score_cache_lock:
+                if len(_SCORE_CACHE) >= _SCORE_CACHE_MAXSIZE:
+                    _evict_score_cache(now)
+                _SCORE_CACHE[key] = (now + _SCORE_CACHE_TTL, result)
+                _SCORE_CACHE_KEYS.setdefault(product_id, set()).add(key)
+
+        request_cache[key] = result
+        return copy.deepcopy(result)
+
+    return wrapper
+
+
+def _drop_cached_score(key: Tuple) -> None:
+    """Remove one entry and its product index slot; the caller holds _score_cache_lock."""
+    _SCORE_CACHE.pop(key, None)
+    keys = _SCORE_CACHE_KEYS.get(key[1])
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del _SCORE_CACHE_KEYS[key[1]]
+
+
+def _evict_score_cache(now: float) -> None:
+    """
+    Drop expired entries, then the least recently used ones if the cache is still full.
+
+    The caller holds _score_cache_lock.
+    """
+    for key in [k for k, (expires_at, _) in _SCORE_CACHE.items() if expires_at <= now]:
+        _drop_cached_score(key)
+    while len(_SCORE_CACHE) >= _SCORE_CACHE_MAXSIZE:
+        _drop_cached_score(next(iter(_SCORE_CACHE)))
+
+
+# Indexed by NOVA group (1-4); index 0 holds the default for an unknown group
+_NOVA_MULTIPLIERS = (
+    1.2,  # Default if NOVA unknown
+    1.0,  # Unprocessed
+    1.1,  # Processed culinary ingredients
+    1.2,  # Processed foods
+    1.5,  # Ultra-processed
+)
 
-IngredientRow = Tuple[
-    Optional[str],  # tag
-    Optional[str],  # name
-    Optional[Decimal],
-    Optional[Decimal],
-    Optional[Decimal],
-    Optional[int],  # rank
-    Optional[Decimal],
-    Optional[str],  # confidence
-]
+# kg CO2 per kg estimates used when a product has no ingredient data
+_NOVA_CO2_ESTIMATES = (3.0, 0.8, 1.5, 3.0, 5.0)
+
+
+def _nova_index(nova_group: Optional[int]) -> int:
+    """Index into the NOVA tuples; 0 for a missing or out-of-range group."""
+    return nova_group if nova_group in (1, 2, 3, 4) else 0
+
+
+@functools.lru_cache(maxsize=65536)
+def _cached_distance(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float) -> float:
+    """Memoized haversine distance in km between two (rounded) coordinates."""
+    return GeocodingService.haversine_distance(origin_lat, origin_lon, dest_lat, dest_lon)
 
 
 class ScoringService:
     """Service for calculating sustainability scores."""
 
-    NOVA_MULTIPLIERS = {
-        1: 1.0,  # Unprocessed
-        2: 1.1,  # Processed culinary ingredients
-        3: 1.2,  # Processed foods
-        4: 1.5,  # Ultra-processed
-        None: 1.2,  # Default if NOVA unknown
-    }
+    # Upper bounds (exclusive) of each CO2 band in kg CO2 per kg product
+    _CO2_THRESHOLDS = (1.0, 2.0, 5.0, 10.0)
+    _CO2_POINTS = (10, 5, 0, -5, -15)
+
+    # Upper bounds (exclusive) of each distance band in km, with the
+    # (transport_mode, kg CO2 per tonne-km, points) of each band
+    _DISTANCE_THRESHOLDS = (100, 500, 2000, 5000)
+    _DISTANCE_BANDS = (
+        ("truck_local", 0.200, 0),  # Local bonus
+        ("truck_regional", 0.200, -2),  # Regional
+        ("truck_national", 0.200, -5),  # National
+        ("rail_truck", 0.100, -8),  # Continental, mix of rail + truck
+        ("sea_truck", 0.050, -10),  # International, mostly sea freight + truck
+    )
+
+    # Upper bounds (exclusive) of each climate efficiency band in kg CO2 per 100 calories
+    _EFFICIENCY_THRESHOLDS = (0.3, 0.6, 1.0, 2.0, 4.0, 7.0)
+    _EFFICIENCY_POINTS = (10, 7, 5, 0, -3, -7, -10)
+    _EFFICIENCY_RATINGS = (
+        "Excellent", "Very Good", "Good", "Moderate", "Poor", "Very Poor", "Extremely Poor"
+    )
+
+    # Lower bounds (inclusive) of each grade band on the 0-100 score
+    _GRADE_THRESHOLDS = (20, 40, 60, 80)
+    _GRADES = ("E", "D", "C", "B", "A")
+
+    # Ingredient CO2 totals aggregated in SQL:
+    # (ingredient_count, has_percentages, has_emission_factors,
+    #  weighted_co2, weighted_percent, weighted_count, co2_sum, co2_count).
+    # The weighted sums only cover ingredients with both a percentage and an
+    # emission factor; the plain sums serve the equal-split case.
+    _INGREDIENT_TOTALS_COLUMNS = """
+            COUNT(pi.ingredient_id),
+            BOOL_OR(pi.percent_estimate IS NOT NULL),
+            BOOL_OR(ief.kg_co2_per_kg IS NOT NULL),
+            SUM(pi.percent_estimate * ief.kg_co2_per_kg)::double precision,
+            (SUM(pi.percent_estimate) FILTER (WHERE ief.kg_co2_per_kg IS NOT NULL))::double precision,
+            COUNT(*) FILTER (WHERE pi.percent_estimate IS NOT NULL AND ief.kg_co2_per_kg IS NOT NULL),
+            SUM(ief.kg_co2_per_kg)::double precision,
+            COUNT(ief.kg_co2_per_kg)
+    """
+
+    _INGREDIENT_JOINS = """
+        JOIN ingredients AS i ON i.id = pi.ingredient_id
+        LEFT JOIN ingredient_emission_factors AS ief
+            ON ief.ingredient_tag = i.tag
+    """
+
+    _PACKAGING_COLUMNS = """
+            pm.name,
+            pm.environmental_score,
+            pm.score_adjustment,
+            pm.recyclability_score,
+            pm.recycling_rate_pct::double precision,
+            pm.biodegradability_score,
+            pm.transport_impact_score,
+            pm.production_kg_co2_per_kg::double precision,
+            p.weight_percentage::double precision
+        FROM packagings AS p
+        JOIN packaging_materials AS pm ON pm.id = p.material_id
+    """
+
+    # Weighted packaging totals aggregated in SQL. Materials without a weight are
+    # ignored by the weighted sums; the plain sums serve the equal-split case.
+    _PACKAGING_TOTALS_COLUMNS = """
+            COUNT(*),
+            BOOL_OR(p.weight_percentage IS NOT NULL),
+            SUM(pm.score_adjustment * p.weight_percentage / 100.0)::double precision,
+            SUM(p.weight_percentage / 100.0)::double precision,
+            SUM(pm.production_kg_co2_per_kg * p.weight_percentage / 100.0)::double precision,
+            SUM(pm.score_adjustment)::double precision,
+            SUM(pm.production_kg_co2_per_kg)::double precision
+        FROM packagings AS p
+        JOIN packaging_materials AS pm ON pm.id = p.material_id
+    """
+
+    _INGREDIENT_TOTALS_SQL = f"""
+        SELECT {_INGREDIENT_TOTALS_COLUMNS}
+        FROM product_ingredients AS pi
+        {_INGREDIENT_JOINS}
+        WHERE pi.product_id = %s
+    """
+
+    # nova_group plus the ingredient totals; no row means the product doesn't exist
+    _PRODUCT_INGREDIENT_TOTALS_SQL = f"""
+        SELECT p.nova_group, {_INGREDIENT_TOTALS_COLUMNS}
+        FROM products AS p
+        LEFT JOIN (
+            product_ingredients AS pi
+            {_INGREDIENT_JOINS}
+        ) ON pi.product_id = p.id
+        WHERE p.id = %s
+        GROUP BY p.id
+    """
+
+    _PACKAGINGS_SQL = f"""
+        SELECT {_PACKAGING_COLUMNS}
+        WHERE p.product_id = %s
+    """
+
+    _PACKAGING_TOTALS_SQL = f"""
+        SELECT {_PACKAGING_TOTALS_COLUMNS}
+        WHERE p.product_id = %s
+    """
+
+    _NUTRIMENTS_SQL = """
+        SELECT calories_100g::double precision, protein_100g::double precision
+        FROM nutriments WHERE product_id = %s
+    """
+
+    # Same queries over a set of products; product_id is the first column
+    _INGREDIENT_TOTALS_BULK_SQL = f"""
+        SELECT pi.product_id, {_INGREDIENT_TOTALS_COLUMNS}
+        FROM product_ingredients AS pi
+        {_INGREDIENT_JOINS}
+        WHERE pi.product_id = ANY(%s)
+        GROUP BY pi.product_id
+    """
+
+    _PACKAGING_TOTALS_BULK_SQL = f"""
+        SELECT p.product_id, {_PACKAGING_TOTALS_COLUMNS}
+        WHERE p.product_id = ANY(%s)
+        GROUP BY p.product_id
+    """
+
+    _NUTRIMENTS_BULK_SQL = """
+        SELECT product_id, calories_100g::double precision, protein_100g::double precision
+        FROM nutriments WHERE product_id = ANY(%s)
+    """
+
+    @staticmethod
+    def invalidate_cached_scores(product_id: int) -> None:
+        """Drop memoized scores for a product (e.g. after it is re-saved)."""
+        with _score_cache_lock:
+            for key in _SCORE_CACHE_KEYS.pop(product_id, ()):
+                _SCORE_CACHE.pop(key, None)
+
+        if not has_app_context():
+            return
+        cache = g.get(_G_SCORE_CACHE_KEY)
+        if cache:
+            for key in [k for k in cache if k[1] == product_id]:
+                del cache[key]
 
     @classmethod
-    def calculate_raw_materials_score(cls, product_id: int) -> Dict[str, Any]:
+    @_memoize_scores
+    def calculate_sustainability_components(cls, product_id: int) -> Dict[str, Any]:
         """
-        Calculate raw materials score for a product (range: -15 to +10 points).
+        Calculate raw materials, packaging and climate efficiency scores together.
+
+        All inputs (product, ingredient totals, packaging totals, nutriments) are
+        fetched in a single pipelined round-trip instead of one query per metric. Also returns
+        the cached transportation score stored on the product.
         """
         conn = get_connection()
 
-        with conn.cursor() as cursor:
-            cursor.execute(
-                "SELECT nova_group FROM products WHERE id = %s",
-                (product_id,),
+        with conn.pipeline():
+            with conn.cursor() as product_cur, conn.cursor() as ingredients_cur, \
+                    conn.cursor() as packagings_cur, conn.cursor() as nutriments_cur:
+                product_cur.execute(
+                    "SELECT nova_group, transportation_score FROM products WHERE id = %s",
+                    (product_id,),
+                )
+                ingredients_cur.execute(cls._INGREDIENT_TOTALS_SQL, (product_id,))
+                packagings_cur.execute(cls._PACKAGING_TOTALS_SQL, (product_id,))
+                nutriments_cur.execute(cls._NUTRIMENTS_SQL, (product_id,))
+
+                product_row = product_cur.fetchone()
+                ingredient_totals = ingredients_cur.fetchone()
+                packaging_totals = packagings_cur.fetchone()
+                nutriment_row = nutriments_cur.fetchone()
+
+        return cls._score_components(product_row, ingredient_totals, packaging_totals, nutriment_row)
+
+    @classmethod
+    def calculate_sustainability_components_bulk(
+        cls, product_ids: Sequence[int]
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Batch version of calculate_sustainability_components for many products.
+
+        Fetches the inputs of every product with one query per table
+        (product_id = ANY) in a single pipelined round-trip, then scores each
+        product from its aggregated rows.
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return {}
+
+        conn = get_connection()
+
+        with conn.pipeline():
+            with conn.cursor() as product_cur, conn.cursor() as ingredients_cur, \
+                    conn.cursor() as packagings_cur, conn.cursor() as nutriments_cur:
+                product_cur.execute(
+                    "SELECT id, nova_group, transportation_score FROM products WHERE id = ANY(%s)",
+                    (product_ids,),
+                )
+                ingredients_cur.execute(cls._INGREDIENT_TOTALS_BULK_SQL, (product_ids,))
+                packagings_cur.execute(cls._PACKAGING_TOTALS_BULK_SQL, (product_ids,))
+                nutriments_cur.execute(cls._NUTRIMENTS_BULK_SQL, (product_ids,))
+
+                product_rows = {row[0]: row[1:] for row in product_cur.fetchall()}
+                ingredient_totals = {row[0]: row[1:] for row in ingredients_cur.fetchall()}
+                packaging_totals = {row[0]: row[1:] for row in packagings_cur.fetchall()}
+                nutriment_rows = {row[0]: row[1:] for row in nutriments_cur.fetchall()}
+
+        return {
+            pid: cls._score_components(
+                product_rows.get(pid),
+                ingredient_totals.get(pid),
+                packaging_totals.get(pid),
+                nutriment_rows.get(pid),
             )
-            product_row = cursor.fetchone()
+            for pid in product_ids
+        }
+
+    @classmethod
+    @_memoize_scores
+    def calculate_all_scores(
+        cls,
+        product_id: int,
+        user_lat: Optional[float] = None,
+        user_lon: Optional[float] = None,
+        include_breakdown: bool = True,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Raw materials, packaging, transportation and climate efficiency scores.
+
+        Every input row (product with ingredient totals, packaging totals, transport
+        row, nutriments and, for the breakdown, the packaging rows) is fetched on the
+        request's connection in a single pipelined round-trip, then scored in-process.
+        The statements are prepared explicitly since every uncached scan runs them.
+        """
+        dest_lat = user_lat if user_lat is not None else current_app.config['DEFAULT_STORE_LAT']
+        dest_lon = user_lon if user_lon is not None else current_app.config['DEFAULT_STORE_LON']
+
+        conn = get_connection()
+
+        with conn.pipeline():
+            with conn.cursor() as ingredients_cur, conn.cursor() as packagings_cur, \
+                    conn.cursor() as transport_cur, conn.cursor() as nutriments_cur, \
+                    conn.cursor() as breakdown_cur:
+                ingredients_cur.execute(cls._PRODUCT_INGREDIENT_TOTALS_SQL, (product_id,), prepare=True)
+                packagings_cur.execute(cls._PACKAGING_TOTALS_SQL, (product_id,), prepare=True)
+                transport_cur.execute(
+                    """SELECT manufacturing_places, (quantity_grams / 1000.0)::double precision
+                       FROM products WHERE id = %s""",
+                    (product_id,),
+                    prepare=True,
+                )
+                nutriments_cur.execute(cls._NUTRIMENTS_SQL, (product_id,), prepare=True)
+                if include_breakdown:
+                    breakdown_cur.execute(cls._PACKAGINGS_SQL, (product_id,), prepare=True)
+
+                product_row = ingredients_cur.fetchone()
+                packaging_totals = packagings_cur.fetchone()
+                transport_row = transport_cur.fetchone()
+                nutriment_row = nutriments_cur.fetchone()
+                packaging_rows = breakdown_cur.fetchall() if include_breakdown else None
 
         if not product_row:
-            return {
-                "points": None,
+            raw = {
+                "points": 0,
+                "status": "product_not_found",
                 "error": "Product not found",
             }
+        else:
+            raw = cls._calculate_ingredient_co2(product_row[1:], product_row[0], include_breakdown)
 
-        nova_group = product_row[0]
+        packaging = cls._score_packaging_totals(packaging_totals)
+        if "status" not in packaging:
+            packaging["materials_breakdown"] = (
+                list(cls._iter_packaging_breakdown(packaging_rows)) if include_breakdown else None
+            )
 
-        with conn.cursor() as cursor:
-            cursor.execute(
-                """
-                SELECT
-                    i.tag,
-                    i.name,
-                    pi.percent_estimate,
-                    pi.percent_min,
-                    pi.percent_max,
-                    pi.rank,
-                    ief.kg_co2_per_kg,
-                    ief.confidence
-                FROM product_ingredients AS pi
-                JOIN ingredients AS i ON i.id = pi.ingredient_id
-                LEFT JOIN ingredient_emission_factors AS ief
-                    ON ief.ingredient_tag = i.tag
-                WHERE pi.product_id = %s
-                ORDER BY pi.rank
-                """,
-                (product_id,),
+        return {
+            "raw": raw,
+            "packaging": packaging,
+            "transport": cls._score_transportation(transport_row, dest_lat, dest_lon),
+            "climate": cls._score_climate_efficiency(nutriment_row, raw),
+        }
+
+    @classmethod
+    def _score_components(
+        cls,
+        product_row: Optional[Tuple],
+        ingredient_totals: Optional[Tuple],
+        packaging_totals: Optional[Tuple],
+        nutriment_row: Optional[Tuple],
+    ) -> Dict[str, Any]:
+        """Score already-fetched rows; product_row is (nova_group, transportation_score)."""
+        if not product_row:
+            raw_materials = {
+                "points": 0,
+                "status": "product_not_found",
+                "error": "Product not found",
+            }
+        else:
+            raw_materials = cls._calculate_ingredient_co2(
+                ingredient_totals, product_row[0], include_breakdown=False
             )
-            ingredients: List[IngredientRow] = cursor.fetchall()
 
-        return cls._calculate_ingredient_co2(ingredients, nova_group)
+        return {
+            "raw_materials": raw_materials,
+            "packaging": cls._score_packaging_totals(packaging_totals),
+            "climate_efficiency": cls._score_climate_efficiency(nutriment_row, raw_materials),
+            "transportation_points": product_row[1] if product_row and product_row[1] is not None else 0,
+        }
+
+    @classmethod
+    @_memoize_scores
+    def calculate_raw_materials_score(
+        cls,
+        product_id: int,
+        include_breakdown: bool = True,
+        conn: Optional[Connection] = None,
+    ) -> Dict[str, Any]:
+        """
+        Calculate raw materials score for a product (range: -15 to +10 points).
+
+        Pass include_breakdown=False to skip the CO2 breakdown when only the
+        points and totals are needed.
+        """
+        conn = conn or get_connection()
+
+        # One round-trip: the product row comes back even without ingredients
+        # (the ingredient count is then 0)
+        with conn.cursor() as cursor:
+            cursor.execute(cls._PRODUCT_INGREDIENT_TOTALS_SQL, (product_id,))
+            row = cursor.fetchone()
+
+        if not row:
+            return {
+                "points": 0,
+                "status": "product_not_found",
+                "error": "Product not found",
+            }
+
+        return cls._calculate_ingredient_co2(row[1:], row[0], include_breakdown)
 
     @classmethod
     def _calculate_ingredient_co2(
         cls,
-        ingredients: Sequence[IngredientRow],
+        ingredient_totals: Optional[Tuple],
         nova_group: Optional[int],
+        include_breakdown: bool = True,
     ) -> Dict[str, Any]:
         """
-        Calculate CO2 from ingredients with graceful degradation.
-        """
-        ingredient_count = len(ingredients)
+        Calculate CO2 from ingredient totals with graceful degradation.
 
-        if ingredient_count == 0:
+        Ingredients without an emission factor are skipped, as are ingredients
+        without a percentage when others have one; otherwise the product is
+        split equally between its ingredients.
+        """
+        if not ingredient_totals or not ingredient_totals[0]:
             return cls._fallback_nova_only(nova_group)
 
-        has_percentages = any(row[2] is not None for row in ingredients)
-        has_emission_factors = any(row[6] is not None for row in ingredients)
+        (
+            ingredient_count,
+            has_percentages,
+            has_emission_factors,
+            weighted_co2,
+            weighted_percent,
+            weighted_count,
+            co2_sum,
+            co2_count,
+        ) = ingredient_totals
 
         if not has_emission_factors:
             return cls._fallback_no_emission_factors(nova_group)
 
-        total_co2 = 0.0
-        total_percent = 0.0
-        ingredients_with_data = 0
-
-        for (
-            _tag,
-            _name,
-            percent_est,
-            _percent_min,
-            _percent_max,
-            _rank,
-            kg_co2,
-            _confidence,
-        ) in ingredients:
-            if kg_co2 is None:
-                continue
-
-            if percent_est is not None:
-                percent = float(percent_est)
-            elif has_percentages:
-                # Other ingredients include explicit percentages; skip this one
-                continue
-            else:
-                percent = 100.0 / ingredient_count
-
-            co2_contribution = (percent / 100.0) * float(kg_co2)
-            total_co2 += co2_contribution
-            total_percent += percent
-            ingredients_with_data += 1
+        if has_percentages:
+            total_co2 = (weighted_co2 or 0.0) / 100.0
+            total_percent = weighted_percent or 0.0
+            ingredients_with_data = weighted_count
+        else:
+            total_co2 = co2_sum / ingredient_count
+            total_percent = 100.0 * co2_count / ingredient_count
+            ingredients_with_data = co2_count
 
-        nova_multiplier = cls.NOVA_MULTIPLIERS.get(nova_group, 1.2)
+        nova_multiplier = _NOVA_MULTIPLIERS[_nova_index(nova_group)]
         final_co2 = total_co2 * nova_multiplier
         points = cls._co2_to_points(final_co2)
 
@@ -147,7 +540,7 @@ class ScoringService:
                 "nova_group": nova_group,
                 "nova_multiplier": nova_multiplier,
                 "final_co2": round(final_co2, 4),
-            },
+            } if include_breakdown else None,
             "confidence": confidence,
             "data_quality": {
                 "has_percentages": has_percentages,
@@ -165,15 +558,12 @@ class ScoringService:
         """
         Convert kg CO2 per kg product to score points (-15 to +10).
         """
-        if co2_kg < 1.0:
-            return 10
-        if co2_kg < 2.0:
-            return 5
-        if co2_kg < 5.0:
-            return 0
-        if co2_kg < 10.0:
-            return -5
-        return -15
+        return ScoringService._CO2_POINTS[bisect_right(ScoringService._CO2_THRESHOLDS, co2_kg)]
+
+    @staticmethod
+    def score_to_grade(score: float) -> str:
+        """Convert a 0-100 sustainability score to a letter grade (A-E)."""
+        return ScoringService._GRADES[bisect_right(ScoringService._GRADE_THRESHOLDS, score)]
 
     @staticmethod
     def _determine_confidence(
@@ -193,15 +583,7 @@ class ScoringService:
         """
         Fallback when no ingredient data available.
         """
-        nova_estimates = {
-            1: 0.8,
-            2: 1.5,
-            3: 3.0,
-            4: 5.0,
-            None: 3.0,
-        }
-
-        estimated_co2 = nova_estimates.get(nova_group, 3.0)
+        estimated_co2 = _NOVA_CO2_ESTIMATES[_nova_index(nova_group)]
         points = cls._co2_to_points(estimated_co2)
 
         return {
@@ -233,7 +615,13 @@ class ScoringService:
         return cls._fallback_nova_only(nova_group)
 
     @classmethod
-    def calculate_packaging_score(cls, product_id: int) -> Dict[str, Any]:
+    @_memoize_scores
+    def calculate_packaging_score(
+        cls,
+        product_id: int,
+        include_breakdown: bool = True,
+        conn: Optional[Connection] = None,
+    ) -> Dict[str, Any]:
         """
         Calculate packaging score for a product (range: -15 to +10 points).
 
@@ -246,32 +634,34 @@ class ScoringService:
         - HDPE Plastic: 26/100 → -10 points
         - Composite/Tetra: 25/100 → -12 points
         - Mixed Plastic: 23/100 → -15 points
+
+        Pass include_breakdown=False to skip the per-material breakdown when
+        only the points are needed.
         """
-        conn = get_connection()
+        conn = conn or get_connection()
 
         with conn.cursor() as cursor:
-            # Get all packaging materials for this product
-            cursor.execute(
-                """
-                SELECT
-                    pm.name,
-                    pm.environmental_score,
-                    pm.score_adjustment,
-                    pm.recyclability_score,
-                    pm.recycling_rate_pct,
-                    pm.biodegradability_score,
-                    pm.transport_impact_score,
-                    pm.production_kg_co2_per_kg,
-                    p.weight_percentage
-                FROM packagings AS p
-                JOIN packaging_materials AS pm ON pm.id = p.material_id
-                WHERE p.product_id = %s
-                """,
-                (product_id,),
-            )
-            packaging_rows = cursor.fetchall()
+            # Weighted totals are aggregated by the database
+            cursor.execute(cls._PACKAGING_TOTALS_SQL, (product_id,))
+            result = cls._score_packaging_totals(cursor.fetchone())
+
+            if "status" not in result:
+                if include_breakdown:
+                    # Get all packaging materials for this product
+                    cursor.execute(cls._PACKAGINGS_SQL, (product_id,))
+                    # Materialized here because the result is memoized
+                    result["materials_breakdown"] = list(
+                        cls._iter_packaging_breakdown(cursor.fetchall())
+                    )
+                else:
+                    result["materials_breakdown"] = None
+
+        return result
 
-        if not packaging_rows:
+    @staticmethod
+    def _score_packaging_totals(totals: Optional[Tuple]) -> Dict[str, Any]:
+        """Score a _PACKAGING_TOTALS_COLUMNS row (see calculate_packaging_score)."""
+        if not totals or not totals[0]:
             return {
                 "points": 0,
                 "status": "no_packaging_data",
@@ -279,12 +669,59 @@ class ScoringService:
                 "confidence": "none",
             }
 
-        # Calculate weighted average score based on weight percentages
-        total_weighted_score = 0.0
-        total_weight = 0.0
-        total_co2 = 0.0
-        materials_breakdown = []
+        (
+            material_count,
+            has_weights,
+            weighted_score,
+            weighted_total,
+            weighted_co2,
+            score_sum,
+            co2_sum,
+        ) = totals
+
+        # Weighted average score based on weight percentages; if no weight
+        # percentages, assume equal distribution
+        if has_weights:
+            total_weighted_score = weighted_score or 0.0
+            total_weight = weighted_total or 0.0
+            total_co2 = weighted_co2 or 0.0
+        else:
+            total_weighted_score = score_sum / material_count
+            total_weight = 1.0
+            total_co2 = (co2_sum or 0.0) / material_count
+
+        # Calculate final score
+        if total_weight > 0:
+            final_score = round(total_weighted_score / total_weight)
+        else:
+            final_score = 0
+
+        # Ensure score is within bounds
+        final_score = max(-15, min(10, final_score))
+
+        # Determine confidence
+        if has_weights and total_weight >= 0.8:
+            confidence = "high"
+        elif total_weight >= 0.5:
+            confidence = "medium"
+        else:
+            confidence = "low"
+
+        return {
+            "points": final_score,
+            "total_co2_kg_per_kg": round(total_co2, 4) if total_co2 > 0 else None,
+            "confidence": confidence,
+            "data_quality": {
+                "has_weight_percentages": has_weights,
+                "total_weight_covered": round(total_weight, 2),
+                "material_count": material_count,
+            },
+        }
 
+    @staticmethod
+    def _iter_packaging_breakdown(packaging_rows: Sequence[Tuple]) -> Iterator[Dict[str, Any]]:
+        """Yield the per-material breakdown of already-fetched packaging rows."""
+        # Stops at the first weighted material
         has_weights = any(row[8] is not None for row in packaging_rows)
 
         for row in packaging_rows:
@@ -300,68 +737,34 @@ class ScoringService:
                 weight_pct,
             ) = row
 
-            # If no weight percentages, assume equal distribution
             if weight_pct is not None:
-                weight = float(weight_pct) / 100.0
+                weight = weight_pct / 100.0
             elif has_weights:
                 # Skip materials without weights if others have them
                 continue
             else:
                 weight = 1.0 / len(packaging_rows)
 
-            total_weighted_score += score_adjustment * weight
-            total_weight += weight
-
-            if co2_per_kg is not None:
-                total_co2 += float(co2_per_kg) * weight
-
-            materials_breakdown.append({
+            yield {
                 "material": name,
                 "environmental_score": env_score,
                 "score_adjustment": score_adjustment,
                 "weight_percentage": round(weight * 100, 1),
                 "recyclability": recyclability,
-                "recycling_rate": float(recycling_rate) if recycling_rate else None,
+                "recycling_rate": recycling_rate if recycling_rate else None,
                 "biodegradability": biodegradability,
                 "transport_impact": transport_impact,
-                "co2_kg_per_kg": float(co2_per_kg) if co2_per_kg else None,
-            })
-
-        # Calculate final score
-        if total_weight > 0:
-            final_score = round(total_weighted_score / total_weight)
-        else:
-            final_score = 0
-
-        # Ensure score is within bounds
-        final_score = max(-15, min(10, final_score))
-
-        # Determine confidence
-        if has_weights and total_weight >= 0.8:
-            confidence = "high"
-        elif total_weight >= 0.5:
-            confidence = "medium"
-        else:
-            confidence = "low"
-
-        return {
-            "points": final_score,
-            "total_co2_kg_per_kg": round(total_co2, 4) if total_co2 > 0 else None,
-            "materials_breakdown": materials_breakdown,
-            "confidence": confidence,
-            "data_quality": {
-                "has_weight_percentages": has_weights,
-                "total_weight_covered": round(total_weight, 2),
-                "material_count": len(packaging_rows),
-            },
-        }
+                "co2_kg_per_kg": co2_per_kg if co2_per_kg else None,
+            }
 
     @classmethod
+    @_memoize_scores
     def calculate_transportation_score(
         cls,
         product_id: int,
         user_lat: Optional[float] = None,
-        user_lon: Optional[float] = None
+        user_lon: Optional[float] = None,
+        conn: Optional[Connection] = None,
     ) -> Dict[str, Any]:
         """
         Calculate transportation score for a product (range: -15 to 0 points).
@@ -378,27 +781,32 @@ class ScoringService:
             product_id: Product ID
             user_lat: User/store latitude (defaults to configured DEFAULT_STORE_LAT)
             user_lon: User/store longitude (defaults to configured DEFAULT_STORE_LON)
+            conn: Connection to use (defaults to the request's connection)
 
         Returns:
             Dictionary with score, distance, transport mode, and CO2 emissions
         """
-        from .geocoding_service import GeocodingService
-        from flask import current_app
-
         # Default to configured store location if coordinates not provided
         dest_lat = user_lat if user_lat is not None else current_app.config['DEFAULT_STORE_LAT']
         dest_lon = user_lon if user_lon is not None else current_app.config['DEFAULT_STORE_LON']
 
-        conn = get_connection()
+        conn = conn or get_connection()
 
         with conn.cursor() as cursor:
             cursor.execute(
-                """SELECT manufacturing_places, quantity
+                """SELECT manufacturing_places, (quantity_grams / 1000.0)::double precision
                    FROM products WHERE id = %s""",
                 (product_id,),
             )
             product_row = cursor.fetchone()
 
+        return cls._score_transportation(product_row, dest_lat, dest_lon)
+
+    @classmethod
+    def _score_transportation(
+        cls, product_row: Optional[Tuple], dest_lat: float, dest_lon: float
+    ) -> Dict[str, Any]:
+        """Score an already-fetched (manufacturing_places, weight_kg) row."""
         if not product_row:
             return {
                 "points": 0,
@@ -406,7 +814,7 @@ class ScoringService:
                 "message": "Product not found",
             }
 
-        manufacturing_places, quantity = product_row
+        manufacturing_places, weight_kg = product_row
 
         # Determine manufacturing location
         manufacturing_location = manufacturing_places
@@ -430,18 +838,19 @@ class ScoringService:
                 "confidence": "none",
             }
 
-        # Calculate distance using coordinates
-        distance_km = GeocodingService.haversine_distance(
-            origin_coords[0], origin_coords[1],
-            dest_lat, dest_lon
+        # Calculate distance using coordinates (rounded to ~110 m so repeated
+        # origin/store pairs hit the cache)
+        distance_km = _cached_distance(
+            round(origin_coords[0], 3), round(origin_coords[1], 3),
+            round(dest_lat, 3), round(dest_lon, 3)
         )
 
         # Determine transport mode based on distance
         transport_mode, emission_factor = cls._determine_transport_mode(distance_km)
 
-        # Calculate emissions (assume 1 kg product weight if not specified)
-        # TODO: Parse quantity field to extract weight in kg
-        product_weight_kg = 1.0  # Default assumption
+        # Calculate emissions from the weight parsed at ingestion (assume 1 kg
+        # product weight if not specified)
+        product_weight_kg = weight_kg or 1.0
 
         # Emissions = distance (km) × weight (tonnes) × emission factor (kg CO2/tonne-km)
         transport_co2 = distance_km * (product_weight_kg / 1000) * emission_factor
@@ -473,16 +882,10 @@ class ScoringService:
         Returns:
             Tuple of (transport_mode, emission_factor_kg_co2_per_tonne_km)
         """
-        if distance_km < 100:
-            return ("truck_local", 0.200)
-        elif distance_km < 500:
-            return ("truck_regional", 0.200)
-        elif distance_km < 2000:
-            return ("truck_national", 0.200)
-        elif distance_km < 5000:
-            return ("rail_truck", 0.100)  # Mix of rail + truck
-        else:
-            return ("sea_truck", 0.050)  # Mostly sea freight + truck
+        mode, emission_factor, _points = ScoringService._DISTANCE_BANDS[
+            bisect_right(ScoringService._DISTANCE_THRESHOLDS, distance_km)
+        ]
+        return (mode, emission_factor)
 
     @staticmethod
     def _distance_to_transportation_score(distance_km: float, transport_mode: str) -> int:
@@ -497,16 +900,9 @@ class ScoringService:
             Score points (-15 to 0)
         """
         # Distance-based scoring
-        if distance_km < 100:
-            score = 0  # Local bonus
-        elif distance_km < 500:
-            score = -2  # Regional
-        elif distance_km < 2000:
-            score = -5  # National
-        elif distance_km < 5000:
-            score = -8  # Continental
-        else:
-            score = -10  # International
+        score = ScoringService._DISTANCE_BANDS[
+            bisect_right(ScoringService._DISTANCE_THRESHOLDS, distance_km)
+        ][2]
 
         # Modifier for air freight (would need product category check)
         # For now, assume no air freight unless distance > 5000 km and perishable
@@ -515,6 +911,7 @@ class ScoringService:
         return score
 
     @classmethod
+    @_memoize_scores
     def calculate_climate_efficiency_score(cls, product_id: int) -> Dict[str, Any]:
         """
         Calculate climate efficiency score for a product (range: -10 to +10 points).
@@ -543,11 +940,7 @@ class ScoringService:
 
         # Get nutritional data
         with conn.cursor() as cursor:
-            cursor.execute(
-                """SELECT calories_100g, protein_100g
-                   FROM nutriments WHERE product_id = %s""",
-                (product_id,),
-            )
+            cursor.execute(cls._NUTRIMENTS_SQL, (product_id,))
             nutriment_row = cursor.fetchone()
 
         # Return 0 if no nutritional data (API can detect data_available: false)
@@ -558,8 +951,29 @@ class ScoringService:
                 "confidence": "none",
             }
 
-        calories_100g = float(nutriment_row[0])
-        protein_100g = float(nutriment_row[1]) if nutriment_row[1] is not None else 0
+        # Get total CO2 from raw materials calculation
+        return cls._score_climate_efficiency(
+            nutriment_row,
+            cls.calculate_raw_materials_score(product_id, include_breakdown=False),
+        )
+
+    @classmethod
+    def _score_climate_efficiency(
+        cls,
+        nutriment_row: Optional[Tuple],
+        raw_materials_result: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Score already-fetched nutriments against a raw materials result."""
+        # Return 0 if no nutritional data (API can detect data_available: false)
+        if not nutriment_row or nutriment_row[0] is None:
+            return {
+                "points": 0,
+                "data_available": False,
+                "confidence": "none",
+            }
+
+        calories_100g = nutriment_row[0]
+        protein_100g = nutriment_row[1] if nutriment_row[1] is not None else 0
 
         # Return 0 if invalid calories
         if calories_100g <= 0:
@@ -569,9 +983,6 @@ class ScoringService:
                 "confidence": "none",
             }
 
-        # Get total CO2 from raw materials calculation
-        raw_materials_result = cls.calculate_raw_materials_score(product_id)
-
         # Return 0 if no CO2 data
         if raw_materials_result.get("total_co2_kg") is None:
             return {
@@ -621,35 +1032,13 @@ class ScoringService:
         Returns:
             Score points (-10 to +10)
         """
-        if co2_per_100_cal < 0.3:
-            return 10  # Excellent
-        elif co2_per_100_cal < 0.6:
-            return 7   # Very Good
-        elif co2_per_100_cal < 1.0:
-            return 5   # Good
-        elif co2_per_100_cal < 2.0:
-            return 0   # Moderate
-        elif co2_per_100_cal < 4.0:
-            return -3  # Poor
-        elif co2_per_100_cal < 7.0:
-            return -7  # Very Poor
-        else:
-            return -10 # Extremely Poor
+        return ScoringService._EFFICIENCY_POINTS[
+            bisect_right(ScoringService._EFFICIENCY_THRESHOLDS, co2_per_100_cal)
+        ]
 
     @staticmethod
     def _get_efficiency_rating(co2_per_100_cal: float) -> str:
         """Get human-readable efficiency rating."""
-        if co2_per_100_cal < 0.3:
-            return "Excellent"
-        elif co2_per_100_cal < 0.6:
-            return "Very Good"
-        elif co2_per_100_cal < 1.0:
-            return "Good"
-        elif co2_per_100_cal < 2.0:
-            return "Moderate"
-        elif co2_per_100_cal < 4.0:
-            return "Poor"
-        elif co2_per_100_cal < 7.0:
-            return "Very Poor"
-        else:
-            return "Extremely Poor"
+        return ScoringService._EFFICIENCY_RATINGS[
+            bisect_right(ScoringService._EFFICIENCY_THRESHOLDS, co2_per_100_cal)
+        ]
@@ -104,10 +104,11 @@ def get_primary_barcode(barcode: str) -> str:
         barcode: The barcode string
 
     Returns:
-        13-digit EAN-13 barcode (zero-padded if needed)
+        13-digit EAN-13 barcode (zero-padded if needed, extra leading zeros
+        stripped from longer codes)
     """
     if not barcode or not barcode.isdigit():
         return barcode
 
     # Pad to 13 digits
-    return barcode.zfill(13)
+    return barcode.lstrip('0').zfill(13)
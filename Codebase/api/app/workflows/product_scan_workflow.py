@@ -4,13 +4,29 @@ Orchestrates the complete flow when a user scans a product QR/barcode
 """
 
 import asyncio
-from typing import Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
 from flask import current_app
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
 
+from ..cache import cache_get, cache_set
 from ..db import get_connection
 from ..services.open_food_facts import OpenFoodFactsService
 from ..services.product_storage import ProductStorageService
-from ..utils.barcode import normalize_barcode, get_primary_barcode
+from ..utils.barcode import get_primary_barcode
+
+# Number of same-category peers a scan returns (and tries to keep available locally)
+SIMILAR_PRODUCTS_LIMIT = 5
+
+# Background OFF prefetch of category peers (PREFETCH_SIMILAR_PRODUCTS); categories
+# being fetched, or attempted within PREFETCH_COOLDOWN seconds, are skipped
+_PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="off-prefetch")
+_prefetching_categories = set()
+_prefetch_attempted_at: Dict[str, float] = {}
+_prefetch_lock = threading.Lock()
 
 
 class ProductScanWorkflow:
@@ -26,39 +42,63 @@ class ProductScanWorkflow:
     6. Make recommendations
     """
 
+    # Store location used when the client sends no coordinates; bound from
+    # DEFAULT_STORE_LAT/LON by the app factory
+    DEFAULT_LAT: Optional[float] = None
+    DEFAULT_LON: Optional[float] = None
+
     def __init__(self, barcode: str, user_lat: Optional[float] = None, user_lon: Optional[float] = None,
                  analyze_ingredients: bool = False, get_recommendations: bool = False):
-        from flask import current_app
-
         self.barcode = barcode
+        # Products are stored under the canonical EAN-13 form (see ProductStorageService.save_product)
+        self.barcode_norm = get_primary_barcode(barcode)
         self.product_id = None
         self.product_data = None
         self.source = None
         self.scores = None
-        self.similar_products = []
+        self.similar_products = None
         self.recommendations = []
         self.ingredients_analysis = None
         self.analyze_ingredients = analyze_ingredients
         self.get_recommendations = get_recommendations
         # Default to configured store location if coordinates not provided
-        self.user_lat = user_lat if user_lat is not None else current_app.config['DEFAULT_STORE_LAT']
-        self.user_lon = user_lon if user_lon is not None else current_app.config['DEFAULT_STORE_LON']
+        self.user_lat = user_lat if user_lat is not None else ProductScanWorkflow.DEFAULT_LAT
+        self.user_lon = user_lon if user_lon is not None else ProductScanWorkflow.DEFAULT_LON
 
     def execute(self) -> Dict[str, Any]:
         """
         Execute the complete workflow
         Returns complete product information with scores and recommendations
+
+        Successful responses are cached in Redis (when configured) for
+        SCAN_CACHE_TTL seconds, keyed by barcode, rounded location and options.
         """
+        use_cache = not current_app.config.get("DEBUG")
+        cache_key = (
+            f"scan:{self.barcode_norm}:{round(self.user_lat, 2)}:{round(self.user_lon, 2)}"
+            f":{int(self.analyze_ingredients)}{int(self.get_recommendations)}"
+        )
+
+        if use_cache:
+            cached = cache_get(cache_key)
+            if cached is not None:
+                return cached
+
+        result = self._execute()
+
+        if use_cache and result.get("status") == "success":
+            cache_set(cache_key, result, current_app.config.get("SCAN_CACHE_TTL", 900))
+        return result
+
+    def _execute(self) -> Dict[str, Any]:
+        """Run the workflow steps (see execute)."""
         try:
-            # Step 1: Check internal database
+            # Steps 1-2: Check internal database, fetching from the external API
+            # speculatively in parallel
             current_app.logger.info(f"[Workflow] Step 1: Checking database for {self.barcode}")
-            self.product_data = self._check_database()
+            self.product_data, off_data = self._lookup_product()
 
             if not self.product_data:
-                # Step 2: Fetch from external API
-                current_app.logger.info(f"[Workflow] Step 2: Fetching from Open Food Facts")
-                off_data = self._fetch_from_api()
-
                 if not off_data:
                     return {
                         "status": "not_found",
@@ -67,12 +107,11 @@ class ProductScanWorkflow:
 
                 # Step 3: Update database
                 current_app.logger.info(f"[Workflow] Step 3: Saving to database")
-                self.product_id = self._save_to_database(off_data)
-
-                # Fetch the saved data (try database first, fallback to OFF data)
-                self.product_data = self._check_database()
-                if not self.product_data:
-                    # Fallback: build from OFF data if database query fails
+                self.product_data = self._save_to_database(off_data)
+                if self.product_data:
+                    self.product_id = self.product_data["id"]
+                else:
+                    # Fallback: build from OFF data if the save failed
                     self.product_data = self._build_product_data_from_off(off_data)
                 self.source = "open_food_facts"
             else:
@@ -82,9 +121,17 @@ class ProductScanWorkflow:
             current_app.logger.info(f"[Workflow] Step 4: Calculating sustainability scores")
             self.scores = self._calculate_scores()
 
-            # Step 5: Find similar products
-            current_app.logger.info(f"[Workflow] Step 5: Finding similar products")
-            self.similar_products = self._find_similar_products()
+            # Step 5: Find similar products (usually already loaded by _check_database)
+            if self.similar_products is None:
+                current_app.logger.info(f"[Workflow] Step 5: Finding similar products")
+                self.similar_products = self._find_similar_products()
+
+            # Recommendations fetch missing peers themselves; otherwise top the
+            # category up in the background (when enabled) so the next scan finds them locally
+            if (current_app.config.get('PREFETCH_SIMILAR_PRODUCTS')
+                    and not self.get_recommendations
+                    and len(self.similar_products) < SIMILAR_PRODUCTS_LIMIT):
+                self._prefetch_similar_products()
 
             # Step 6: Make recommendations (optional)
             if self.get_recommendations:
@@ -127,52 +174,76 @@ class ProductScanWorkflow:
         """
         Step 1: Check if product exists in internal database
         Returns product data if found, None otherwise
+
+        Up to SIMILAR_PRODUCTS_LIMIT products of the same primary category are fetched in the same
+        round trip and stored on self.similar_products (step 5).
         """
         conn = get_connection()
 
-        # Get all possible barcode variations
-        barcode_variants = normalize_barcode(self.barcode)
-
-        with conn.cursor() as cursor:
-            # Build dynamic query for all barcode variants
-            placeholders = ', '.join(['%s'] * len(barcode_variants))
-            query = f"""SELECT p.id, p.upc, p.product_name, m.name as brand,
+        with conn.cursor(row_factory=dict_row) as cursor:
+            # Single probe of the unique upc index on the canonical barcode
+            query = """SELECT p.id, p.upc, p.product_name, m.name as brand,
                           p.quantity, p.manufacturing_places,
                           c.name as primary_category,
                           p.nova_group, p.ecoscore_grade, p.ecoscore_score,
                           p.image_url,
                           p.image_small_url,
-                          p.price
+                          p.price::double precision AS price,
+                          (SELECT COALESCE(json_agg(peer), '[]'::json)
+                           FROM (SELECT sp.id, sp.upc, sp.product_name, sm.name AS brand,
+                                        sc.name AS category, sp.image_small_url,
+                                        sp.price::double precision AS price
+                                 FROM products sp
+                                 LEFT JOIN manufacturers sm ON sp.brand_id = sm.id
+                                 JOIN product_categories spc ON sp.id = spc.product_id AND spc.is_primary = TRUE
+                                 JOIN categories sc ON spc.category_id = sc.id
+                                 WHERE sc.name = c.name
+                                   AND sp.id != p.id
+                                 LIMIT %s) AS peer) AS similar_products
                    FROM products p
                    LEFT JOIN manufacturers m ON p.brand_id = m.id
                    LEFT JOIN product_categories pc ON p.id = pc.product_id AND pc.is_primary = TRUE
                    LEFT JOIN categories c ON pc.category_id = c.id
-                   WHERE p.upc IN ({placeholders})"""
+                   WHERE p.upc = %s"""
 
-            cursor.execute(query, tuple(barcode_variants))
+            # Runs on every scan: prepared so each pooled connection plans it once, and
+            # fetched in binary to skip text parsing of the numeric columns
+            cursor.execute(query, (SIMILAR_PRODUCTS_LIMIT, self.barcode_norm), prepare=True, binary=True)
             result = cursor.fetchone()
 
         if result:
-            self.product_id = result[0]
-            return {
-                "id": result[0],
-                "upc": result[1],
-                "product_name": result[2],
-                "brand": result[3],
-                "quantity": result[4],
-                "manufacturing_places": result[5],
-                "primary_category": result[6],
-                "nova_group": result[7],
-                "ecoscore_grade": result[8],
-                "ecoscore_score": result[9],
-                "image_url": result[10],
-                "image_small_url": result[11],
-                "price": float(result[12]) if result[12] is not None else None
-            }
+            # Rows come back keyed by column name, already in the response shape
+            self.product_id = result["id"]
+            self.similar_products = result.pop("similar_products")
+            return result
 
         return None
 
-    def _fetch_from_api(self) -> Optional[Dict[str, Any]]:
+    def _lookup_product(self) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Steps 1-2: Check the database while fetching from Open Food Facts
+        Returns (product_data, None) on a database hit, (None, raw OFF data or None) on a miss
+
+        The OFF request is started alongside the database check so a miss doesn't
+        pay for both sequentially; it is cancelled as soon as the database has the product.
+        """
+        # The OFF request runs on the shared HTTP client loop while the database
+        # is checked in this thread
+        off_fetch = OpenFoodFactsService.submit(self._fetch_from_api())
+        try:
+            product_data = self._check_database()
+        except Exception:
+            off_fetch.cancel()
+            raise
+
+        if product_data:
+            off_fetch.cancel()
+            return product_data, None
+
+        current_app.logger.info(f"[Workflow] Step 2: Fetching from Open Food Facts")
+        return None, off_fetch.result()
+
+    async def _fetch_from_api(self) -> Optional[Dict[str, Any]]:
         """
         Step 2: Fetch product from Open Food Facts API
         Returns raw OFF data if found, None otherwise
@@ -180,17 +251,13 @@ class ProductScanWorkflow:
         Note: OpenFoodFactsService.fetch_product handles barcode variant normalization internally
         """
         # Fetch product (handles barcode variants internally)
-        off_product = asyncio.run(
-            OpenFoodFactsService.fetch_product(self.barcode)
-        )
+        off_product = await OpenFoodFactsService.fetch_product(self.barcode)
 
         # Also fetch price data from Prices API if product found
         if off_product:
             # Try to get price data using the successful barcode from the product
             successful_barcode = off_product.get('code', self.barcode)
-            price_data = asyncio.run(
-                OpenFoodFactsService.fetch_product_price(successful_barcode, currency='USD')
-            )
+            price_data = await OpenFoodFactsService.fetch_product_price(successful_barcode, currency='USD')
             # Add price to OFF product data if available
             if price_data:
                 off_product['price_info'] = price_data
@@ -200,7 +267,7 @@ class ProductScanWorkflow:
     def _build_product_data_from_off(self, off_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Build product data dictionary from Open Food Facts data
-        Used as fallback when database query fails after fresh import
+        Used as fallback when saving a fresh import fails
         """
         # Extract price if available
         price = None
@@ -224,16 +291,16 @@ class ProductScanWorkflow:
             "price": price
         }
 
-    def _save_to_database(self, off_data: Dict[str, Any]) -> Optional[int]:
+    def _save_to_database(self, off_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
         Step 3: Save fetched product data to database
-        Returns product ID if saved successfully
+        Returns the saved product row if saved successfully
         """
         try:
             conn = get_connection()
-            product_id = ProductStorageService.save_product(conn, off_data)
-            current_app.logger.info(f"[Workflow] Saved product {self.barcode} with ID {product_id}")
-            return product_id
+            product = ProductStorageService.save_product_row(conn, off_data)
+            current_app.logger.info(f"[Workflow] Saved product {self.barcode} with ID {product['id']}")
+            return product
         except Exception as exc:
             current_app.logger.exception(f"[Workflow] Error saving product {self.barcode}")
             return None
@@ -241,50 +308,86 @@ class ProductScanWorkflow:
     def _calculate_scores(self) -> Dict[str, Any]:
         """
         Step 4: Calculate sustainability scores for the product.
+
+        Scores for the default store location are read from product_scores when
+        present; on a miss they are computed live and stored for the next scan.
         """
         if not self.product_id:
             return {}
 
-        from ..services.scoring_service import ScoringService
+        at_default_store = (
+            self.user_lat == ProductScanWorkflow.DEFAULT_LAT
+            and self.user_lon == ProductScanWorkflow.DEFAULT_LON
+        )
+
+        if at_default_store:
+            stored = self._load_stored_scores()
+            if stored is not None:
+                return stored
+
+        scores = self._compute_scores()
+
+        if at_default_store:
+            self._store_scores(scores)
+        return scores
+
+    def _load_stored_scores(self) -> Optional[Dict[str, Any]]:
+        """Return the precomputed scores of the product, or None if not stored."""
+        with get_connection().cursor() as cursor:
+            cursor.execute(
+                "SELECT total_score, grade, metrics FROM product_scores WHERE product_id = %s",
+                (self.product_id,),
+                prepare=True,
+            )
+            row = cursor.fetchone()
+
+        if not row:
+            return None
+        return {"total_score": row[0], "grade": row[1], "metrics": row[2]}
 
-        # Calculate raw materials score
-        raw_materials = ScoringService.calculate_raw_materials_score(self.product_id)
-        raw_points = raw_materials.get("points")
-        raw_points_value = raw_points if isinstance(raw_points, (int, float)) else 0
+    def _store_scores(self, scores: Dict[str, Any]) -> None:
+        """UPSERT the computed scores into product_scores; failures only cost a recompute."""
+        try:
+            get_connection().execute(
+                """INSERT INTO product_scores (product_id, total_score, grade, metrics)
+                   VALUES (%s, %s, %s, %s)
+                   ON CONFLICT (product_id) DO UPDATE SET
+                       total_score = EXCLUDED.total_score,
+                       grade = EXCLUDED.grade,
+                       metrics = EXCLUDED.metrics,
+                       computed_at = NOW()""",
+                (self.product_id, scores["total_score"], scores["grade"], Jsonb(scores["metrics"])),
+                prepare=True,
+            )
+        except Exception as exc:
+            current_app.logger.warning(f"[Workflow] Failed to store scores for product {self.product_id}: {exc}")
 
-        # Calculate packaging score
-        packaging = ScoringService.calculate_packaging_score(self.product_id)
-        packaging_points = packaging.get("points")
-        packaging_points_value = packaging_points if isinstance(packaging_points, (int, float)) else 0
+    def _compute_scores(self) -> Dict[str, Any]:
+        """Compute the sustainability scores live (see _calculate_scores)."""
+        from ..services.scoring_service import ScoringService
 
-        # Calculate transportation score with user location
-        transportation = ScoringService.calculate_transportation_score(
+        # Calculate raw materials, packaging, transportation (with user location)
+        # and climate efficiency scores from one pipelined round-trip
+        component_scores = ScoringService.calculate_all_scores(
             self.product_id,
             user_lat=self.user_lat,
-            user_lon=self.user_lon
+            user_lon=self.user_lon,
+            include_breakdown=False,
         )
-        transportation_points = transportation.get("points")
-        transportation_points_value = transportation_points if isinstance(transportation_points, (int, float)) else 0
-
-        # Calculate climate efficiency score
-        climate_efficiency = ScoringService.calculate_climate_efficiency_score(self.product_id)
-        climate_points = climate_efficiency.get("points")
-        climate_points_value = climate_points if isinstance(climate_points, (int, float)) else 0
+        raw_materials = component_scores["raw"]
+        raw_points = raw_materials["points"]
+        packaging = component_scores["packaging"]
+        packaging_points = packaging["points"]
+        transportation = component_scores["transport"]
+        transportation_points = transportation["points"]
+        climate_efficiency = component_scores["climate"]
+        climate_points = climate_efficiency["points"]
 
         # Calculate total points from all implemented metrics (4 metrics)
-        total_points = raw_points_value + packaging_points_value + transportation_points_value + climate_points_value
+        total_points = raw_points + packaging_points + transportation_points + climate_points
         final_score = max(0, min(100, 50 + total_points))
 
-        if final_score >= 80:
-            grade = "A"
-        elif final_score >= 60:
-            grade = "B"
-        elif final_score >= 40:
-            grade = "C"
-        elif final_score >= 20:
-            grade = "D"
-        else:
-            grade = "E"
+        grade = ScoringService.score_to_grade(final_score)
 
         # Build clean response with only implemented metrics
         scores = {
@@ -293,8 +396,8 @@ class ProductScanWorkflow:
             "metrics": {}
         }
 
-        # Only include raw materials if implemented
-        if raw_points is not None and raw_materials.get("status") != "not_implemented":
+        # Only include raw materials if the product was found
+        if raw_materials.get("status") != "product_not_found":
             scores["metrics"]["raw_materials"] = {
                 "score": raw_points,
                 "co2_kg_per_kg": raw_materials.get("total_co2_kg"),
@@ -302,7 +405,7 @@ class ProductScanWorkflow:
             }
 
         # Only include packaging if implemented
-        if packaging_points is not None and packaging.get("status") != "no_packaging_data":
+        if packaging.get("status") != "no_packaging_data":
             scores["metrics"]["packaging"] = {
                 "score": packaging_points,
                 "co2_kg_per_kg": packaging.get("total_co2_kg_per_kg"),
@@ -310,7 +413,7 @@ class ProductScanWorkflow:
             }
 
         # Only include transportation if implemented
-        if transportation_points is not None and transportation.get("status") not in ["no_location_data", "geocoding_failed"]:
+        if transportation.get("status") not in ["no_location_data", "geocoding_failed"]:
             scores["metrics"]["transportation"] = {
                 "score": transportation_points,
                 "distance_km": transportation.get("distance_km"),
@@ -352,40 +455,74 @@ class ProductScanWorkflow:
 
         try:
             conn = get_connection()
-            with conn.cursor() as cursor:
+            with conn.cursor(row_factory=dict_row) as cursor:
                 # Find products in same category, different brand
                 cursor.execute(
                     """SELECT p.id, p.upc, p.product_name, m.name as brand,
-                              c.name as category, p.image_small_url, p.price
+                              c.name as category, p.image_small_url,
+                              p.price::double precision as price
                        FROM products p
                        LEFT JOIN manufacturers m ON p.brand_id = m.id
                        LEFT JOIN product_categories pc ON p.id = pc.product_id AND pc.is_primary = TRUE
                        LEFT JOIN categories c ON pc.category_id = c.id
                        WHERE c.name = %s
                          AND p.id != %s
-                       LIMIT 5""",
-                    (self.product_data.get('primary_category'), self.product_id)
+                       LIMIT %s""",
+                    (self.product_data.get('primary_category'), self.product_id, SIMILAR_PRODUCTS_LIMIT),
+                    prepare=True,
+                    binary=True,
                 )
-                results = cursor.fetchall()
-
-            similar = []
-            for row in results:
-                similar.append({
-                    "id": row[0],
-                    "upc": row[1],
-                    "product_name": row[2],
-                    "brand": row[3],
-                    "category": row[4],
-                    "image_small_url": row[5],
-                    "price": float(row[6]) if row[6] is not None else None
-                })
-
-            return similar
+                return cursor.fetchall()
 
         except Exception as exc:
             current_app.logger.exception(f"[Workflow] Error finding similar products")
             return []
 
+    def _prefetch_similar_products(self) -> None:
+        """
+        Fetch and save missing same-category products from OFF in the background.
+
+        Uses the recommendation service's batched category search (one OFF
+        request for the whole batch) and bulk save; runs in its own app context
+        so the scan response isn't delayed. Each category is attempted at most once
+        per PREFETCH_COOLDOWN seconds, whether or not OFF returned anything.
+        """
+        category = self.product_data.get('primary_category') if self.product_data else None
+        if not category:
+            return
+
+        cooldown = current_app.config.get('PREFETCH_COOLDOWN', 3600)
+        with _prefetch_lock:
+            attempted_at = _prefetch_attempted_at.get(category)
+            if category in _prefetching_categories or (
+                attempted_at is not None and time.monotonic() - attempted_at < cooldown
+            ):
+                return
+            _prefetching_categories.add(category)
+            _prefetch_attempted_at[category] = time.monotonic()
+
+        from ..services.recommendation_service import RecommendationService
+
+        app = current_app._get_current_object()
+        needed = SIMILAR_PRODUCTS_LIMIT - len(self.similar_products)
+        exclude_upcs = [self.product_data.get('upc')] + [p['upc'] for p in self.similar_products]
+
+        def prefetch() -> None:
+            try:
+                with app.app_context():
+                    OpenFoodFactsService.run(
+                        RecommendationService.fetch_and_save_similar_products(category, exclude_upcs, needed)
+                    )
+            except Exception as exc:
+                app.logger.warning(f"[Workflow] Prefetch of category {category} failed: {exc}")
+            finally:
+                with _prefetch_lock:
+                    _prefetching_categories.discard(category)
+                    # The cooldown runs from the end of the attempt
+                    _prefetch_attempted_at[category] = time.monotonic()
+
+        _PREFETCH_EXECUTOR.submit(prefetch)
+
     def _make_recommendations(self) -> list:
         """
         Step 6: Generate recommendations based on sustainability scores
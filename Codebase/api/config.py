@@ -16,12 +16,24 @@ class Config:
         "DATABASE_URL", "postgresql://eyramm@127.0.0.1/ecoapp"
     )
     DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    # Extra connections for batch saves and background prefetches
+    DB_POOL_OVERFLOW = int(os.getenv("DB_POOL_OVERFLOW", "10"))
     DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
     OFF_BASE_URL = os.getenv(
         "OFF_BASE_URL", "https://world.openfoodfacts.org/api/v2/product"
     )
     OFF_API_TIMEOUT = int(os.getenv("OFF_API_TIMEOUT", "10"))
 
+    # Optional Redis cache for product scan responses (disabled when unset)
+    REDIS_URL = os.getenv("REDIS_URL")
+    REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "0.5"))
+    SCAN_CACHE_TTL = int(os.getenv("SCAN_CACHE_TTL", "900"))
+
+    # Background OFF top-up of sparse categories on scans (off by default); each
+    # category is attempted at most once per PREFETCH_COOLDOWN seconds
+    PREFETCH_SIMILAR_PRODUCTS = _bool_env("PREFETCH_SIMILAR_PRODUCTS", "false")
+    PREFETCH_COOLDOWN = int(os.getenv("PREFETCH_COOLDOWN", "3600"))
+
     # Gemini AI API configuration
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
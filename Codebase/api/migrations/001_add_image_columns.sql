@@ -9,13 +9,25 @@ ALTER TABLE products
 ADD COLUMN IF NOT EXISTS image_url TEXT,
 ADD COLUMN IF NOT EXISTS image_small_url TEXT;
 
--- Migrate existing data from raw_off_data JSONB to new columns
-UPDATE products
-SET
-  image_url = raw_off_data->>'image_front_url',
-  image_small_url = raw_off_data->>'image_front_small_url'
-WHERE image_url IS NULL
-  AND raw_off_data IS NOT NULL;
+-- Migrate existing data from raw_off_data JSONB to new columns.
+-- Skipped once 006 has turned them into generated columns (which can't be
+-- UPDATEd), so re-running on startup doesn't fail
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'products'
+          AND column_name = 'image_url'
+          AND is_generated = 'NEVER'
+    ) THEN
+        UPDATE products
+        SET
+          image_url = raw_off_data->>'image_front_url',
+          image_small_url = raw_off_data->>'image_front_small_url'
+        WHERE image_url IS NULL
+          AND raw_off_data IS NOT NULL;
+    END IF;
+END$$;
 
 -- Create indexes for faster image lookups (optional, only if needed)
 -- CREATE INDEX IF NOT EXISTS idx_products_image_url ON products(image_url) WHERE image_url IS NOT NULL;
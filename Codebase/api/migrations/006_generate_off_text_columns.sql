@@ -0,0 +1,41 @@
+-- Migration: Project OFF text fields from raw_off_data as generated columns
+-- Created: 2025-11-09
+-- Description: Postgres derives the plain text product fields from the stored JSONB
+--              payload, so save_product only binds parsed values plus raw_off_data
+
+BEGIN;
+
+-- Guarded so re-running on startup doesn't rebuild the columns every deploy
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'products'
+          AND column_name = 'product_name'
+          AND is_generated = 'NEVER'
+    ) THEN
+        ALTER TABLE products
+        DROP COLUMN IF EXISTS product_name,
+        DROP COLUMN IF EXISTS quantity,
+        DROP COLUMN IF EXISTS serving_size,
+        DROP COLUMN IF EXISTS manufacturing_places,
+        DROP COLUMN IF EXISTS ingredients_text,
+        DROP COLUMN IF EXISTS labels_text,
+        DROP COLUMN IF EXISTS packaging_text,
+        DROP COLUMN IF EXISTS image_url,
+        DROP COLUMN IF EXISTS image_small_url;
+
+        ALTER TABLE products
+        ADD COLUMN product_name TEXT NOT NULL GENERATED ALWAYS AS (raw_off_data->>'product_name') STORED,
+        ADD COLUMN quantity TEXT GENERATED ALWAYS AS (raw_off_data->>'quantity') STORED,
+        ADD COLUMN serving_size TEXT GENERATED ALWAYS AS (raw_off_data->>'serving_size') STORED,
+        ADD COLUMN manufacturing_places TEXT GENERATED ALWAYS AS (raw_off_data->>'manufacturing_places') STORED,
+        ADD COLUMN ingredients_text TEXT GENERATED ALWAYS AS (raw_off_data->>'ingredients_text') STORED,
+        ADD COLUMN labels_text TEXT GENERATED ALWAYS AS (raw_off_data->>'labels') STORED,
+        ADD COLUMN packaging_text TEXT GENERATED ALWAYS AS (raw_off_data->>'packaging') STORED,
+        ADD COLUMN image_url TEXT GENERATED ALWAYS AS (raw_off_data->>'image_front_url') STORED,
+        ADD COLUMN image_small_url TEXT GENERATED ALWAYS AS (raw_off_data->>'image_front_small_url') STORED;
+    END IF;
+END$$;
+
+COMMIT;
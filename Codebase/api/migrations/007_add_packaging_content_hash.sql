@@ -0,0 +1,14 @@
+-- Migration: Add content hash to packagings
+-- Created: 2025-11-09
+-- Description: Natural key for packaging rows so saves can UPSERT instead of delete + re-insert.
+--              Existing rows keep a NULL hash and are replaced on the product's next save.
+
+BEGIN;
+
+ALTER TABLE packagings
+ADD COLUMN IF NOT EXISTS content_hash BYTEA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_packagings_product_content
+    ON packagings(product_id, content_hash);
+
+COMMIT;
@@ -0,0 +1,19 @@
+-- Migration: Cache recommendation scores on products
+-- Created: 2025-11-09
+-- Description: Materialize the recommendation score inputs so recommendations read one row
+--              per candidate instead of re-running the scoring queries on every request.
+--              Backfill with `flask refresh-scores`.
+
+BEGIN;
+
+ALTER TABLE products
+ADD COLUMN IF NOT EXISTS sustainability_score SMALLINT,
+ADD COLUMN IF NOT EXISTS sustainability_grade CHAR(1),
+ADD COLUMN IF NOT EXISTS harmful_ingredients SMALLINT,
+ADD COLUMN IF NOT EXISTS caution_ingredients SMALLINT,
+ADD COLUMN IF NOT EXISTS recommendation_score SMALLINT,
+ADD COLUMN IF NOT EXISTS scores_updated_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_products_recommendation_score ON products(recommendation_score);
+
+COMMIT;
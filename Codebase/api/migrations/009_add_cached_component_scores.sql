@@ -0,0 +1,14 @@
+-- Migration: Cache per-metric sustainability points on products
+-- Created: 2025-11-10
+-- Description: Store the raw materials, packaging and climate efficiency points next to the
+--              cached transportation score, written on save / `flask refresh-scores`, so the
+--              recommendation score read path is a single row lookup.
+
+BEGIN;
+
+ALTER TABLE products
+ADD COLUMN IF NOT EXISTS raw_materials_score SMALLINT,
+ADD COLUMN IF NOT EXISTS packaging_score SMALLINT,
+ADD COLUMN IF NOT EXISTS climate_score SMALLINT;
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- Migration: Add geocoding_cache table
+-- Created: 2025-11-10
+-- Description: Persist geocoded manufacturing locations so Nominatim is only queried once per
+--              location across restarts and workers (keys are lower-cased, trimmed location text)
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS geocoding_cache (
+    location TEXT PRIMARY KEY,
+    lat DOUBLE PRECISION NOT NULL,
+    lon DOUBLE PRECISION NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+COMMIT;
@@ -0,0 +1,17 @@
+-- Migration: Add covering indexes for the scoring queries
+-- Created: 2025-11-10
+-- Description: Let the ingredient and packaging totals used by ScoringService be answered
+--              with index-only scans on product_ingredients, ingredient_emission_factors
+--              and packagings
+--
+-- Note: CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so unlike the
+--       other migrations this file has no BEGIN/COMMIT. Run it without --single-transaction.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pi_product_rank
+    ON product_ingredients(product_id, rank) INCLUDE (ingredient_id, percent_estimate);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ief_tag
+    ON ingredient_emission_factors(ingredient_tag) INCLUDE (kg_co2_per_kg, confidence);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_packagings_product_covering
+    ON packagings(product_id) INCLUDE (material_id, weight_percentage);
@@ -0,0 +1,37 @@
+-- Migration: Canonicalize product UPCs to EAN-13
+-- Created: 2025-11-10
+-- Description: Product lookups probe the unique upc index with the canonical, zero-padded
+--              13-digit barcode only (no OR over barcode variants), so pad any older rows that
+--              were stored in a shorter form, and strip the extra leading zeros of longer ones
+--              (e.g. 00012345678905), matching get_primary_barcode (lstrip('0').zfill(13)).
+--              Rows whose canonical form already exists are left alone to respect the unique
+--              constraint.
+
+BEGIN;
+
+UPDATE products AS p
+SET upc = lpad(p.upc, 13, '0')
+WHERE p.upc ~ '^[0-9]{1,12}$'
+  AND NOT EXISTS (
+      SELECT 1 FROM products AS q WHERE q.upc = lpad(p.upc, 13, '0')
+  );
+
+-- greatest() keeps lpad from truncating codes that are still longer than 13 digits
+-- once their leading zeros are stripped (zfill never truncates). DISTINCT ON picks one
+-- row per canonical form, since NOT EXISTS doesn't see rows rewritten by this statement
+WITH candidates AS (
+    SELECT DISTINCT ON (canonical) id, canonical
+    FROM (SELECT id, lpad(ltrim(upc, '0'), greatest(13, length(ltrim(upc, '0'))), '0') AS canonical
+          FROM products
+          WHERE upc ~ '^0[0-9]{13,}$') AS c
+    ORDER BY canonical, id
+)
+UPDATE products AS p
+SET upc = candidates.canonical
+FROM candidates
+WHERE p.id = candidates.id
+  AND NOT EXISTS (
+      SELECT 1 FROM products AS q WHERE q.upc = candidates.canonical
+  );
+
+COMMIT;
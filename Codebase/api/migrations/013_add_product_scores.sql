@@ -0,0 +1,17 @@
+-- Migration: Add product_scores table
+-- Created: 2025-11-10
+-- Description: Store the scan workflow's sustainability scores for the default store location
+--              so repeat scans read one row instead of recomputing every metric. Rows are
+--              deleted when the product is re-saved and recomputed on the next scan.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS product_scores (
+    product_id BIGINT PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+    total_score SMALLINT NOT NULL,           -- 0-100
+    grade CHAR(1) NOT NULL,                  -- A-E
+    metrics JSONB NOT NULL,
+    computed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+COMMIT;
@@ -0,0 +1,12 @@
+-- Migration: Allow failed lookups in geocoding_cache
+-- Created: 2025-11-10
+-- Description: Store locations Nominatim could not resolve as rows with NULL coordinates, so
+--              unresolvable places are not re-queried (at 1 request/second) by every cold
+--              worker. Such rows are ignored once older than the negative-cache TTL.
+
+BEGIN;
+
+ALTER TABLE geocoding_cache ALTER COLUMN lat DROP NOT NULL;
+ALTER TABLE geocoding_cache ALTER COLUMN lon DROP NOT NULL;
+
+COMMIT;
@@ -0,0 +1,34 @@
+-- Migration: Re-parse quantity_grams for volume quantities
+-- Created: 2025-11-10
+-- Description: parse_quantity used to store centilitre/decilitre/litre quantities as grams of
+--              the bare number (e.g. "1.5 L" -> 1.5), which makes the weight-based transport
+--              CO2 ~1000x too low. Recompute them from the generated quantity column with the
+--              same rules (~1 g/ml) and drop the affected precomputed scan scores.
+--              Idempotent: rows already holding the parsed value are left alone.
+
+BEGIN;
+
+WITH parsed AS (
+    SELECT id,
+           substring(q from '(\d+\.?\d*)')::numeric
+               * CASE substring(q from '\d\s*(dl|cl|l|litres?|liters?)\M')
+                     WHEN 'dl' THEN 100
+                     WHEN 'cl' THEN 10
+                     ELSE 1000
+                 END AS grams
+    FROM (SELECT id, lower(btrim(quantity)) AS q FROM products) AS p
+    WHERE q ~ '\d\s*(dl|cl|l|litres?|liters?)\M'
+      AND q !~ '(kg|lb|pound|oz|ounce)'
+),
+updated AS (
+    UPDATE products
+    SET quantity_grams = round(parsed.grams, 2)
+    FROM parsed
+    WHERE products.id = parsed.id
+      AND parsed.grams < 100000000  -- fits DECIMAL(10,2)
+      AND products.quantity_grams IS DISTINCT FROM round(parsed.grams, 2)
+    RETURNING products.id
+)
+DELETE FROM product_scores WHERE product_id IN (SELECT id FROM updated);
+
+COMMIT;